@@ -7,8 +7,31 @@ import edge_tts
 from edge_tts import VoicesManager
 
 
-async def generateAudio(output_dir: str, brainrot_file_path: str) -> str:
-    """Main function"""
+async def pick_voice(voices: VoicesManager = None) -> str:
+    """Returns the name of a random male English voice.
+
+    Args:
+        voices: Optional pre-loaded voice catalogue. It is fetched from the
+            edge-tts service when omitted.
+    """
+    if voices is None:
+        voices = await VoicesManager.create()
+    voice = voices.find(Gender="Male", Language="en")
+    return random.choice(voice)["Name"]
+
+
+async def generateAudio(output_dir: str, brainrot_file_path: str, voices: VoicesManager = None) -> str:
+    """Generates an mp3 narration of the brainrot text with a random male English voice.
+
+    Args:
+        output_dir: The directory where the audio file will be saved.
+        brainrot_file_path: The path to the brainrot text file to narrate.
+        voices: Optional pre-loaded voice catalogue. It is fetched from the
+            edge-tts service when omitted.
+
+    Returns:
+        The path to the generated audio file, or None if an error occurred.
+    """
     base_name = "audio_"
     ext = ".mp3"
     counter = 1
@@ -20,13 +43,11 @@ async def generateAudio(output_dir: str, brainrot_file_path: str) -> str:
     output_path = os.path.join(output_dir, f"{base_name}{counter}{ext}")
 
     try:
-        voices = await VoicesManager.create()
-        voice = voices.find(Gender="Male", Language="en")
+        voice = await pick_voice(voices)
         with open(brainrot_file_path, "r", encoding="utf-8") as file:
             brainrot_text = file.read()
 
-            communicate = edge_tts.Communicate(
-                brainrot_text, random.choice(voice)["Name"])
+            communicate = edge_tts.Communicate(brainrot_text, voice)
             await communicate.save(output_path)
             print(f"✅ Audio saved to: {output_path}")
             return output_path
@@ -25,15 +25,15 @@ def get_audio_duration(audio_file_path):
     return duration
 
 
-def get_random_video_url(channel_url):
+def get_channel_entries(channel_url):
     """
-    Retrieves a random video URL from a YouTube channel.
+    Lists the videos of a YouTube channel without downloading them.
 
     Args:
         channel_url (str): The URL of the YouTube channel.
 
     Returns:
-        str: A random video URL from the channel.
+        list: A dict with the 'id', 'url' and 'title' of each video.
 
     Raises:
         Exception: If no video URLs are found or if the response format is unexpected.
@@ -48,24 +48,41 @@ def get_random_video_url(channel_url):
 
         # Check if 'info' is a dictionary and has 'entries'
         if isinstance(info, dict) and 'entries' in info:
-            video_entries = info['entries']
-            urls = [entry['url']
-                    for entry in video_entries if isinstance(entry, dict)]
-            if not urls:
+            entries = [
+                {'id': entry.get('id'), 'url': entry['url'],
+                 'title': entry.get('title', '')}
+                for entry in info['entries']
+                if isinstance(entry, dict) and 'url' in entry
+            ]
+            if not entries:
                 raise Exception("No video URLs found.")
-            return random.choice(urls)
+            return entries
 
         # If 'info' is not the expected type, raise an exception
         raise Exception(
             "Failed to retrieve video URLs. The response is not a dictionary with 'entries'.")
 
 
-def download_full_video(video_url):
+def get_random_video_url(channel_url):
+    """
+    Retrieves a random video URL from a YouTube channel.
+
+    Args:
+        channel_url (str): The URL of the YouTube channel.
+
+    Returns:
+        str: A random video URL from the channel.
+    """
+    return random.choice(get_channel_entries(channel_url))['url']
+
+
+def download_full_video(video_url, output_dir=VIDEO_PATH):
     """
     Downloads a video from a given URL, ensuring it meets size and title criteria.
 
     Args:
         video_url (str): The URL of the video to download.
+        output_dir (str): The directory where the video will be saved.
 
     Returns:
         str: The path to the downloaded video file.
@@ -109,7 +126,7 @@ def download_full_video(video_url):
             raise ValueError(f"Video title contains 'Vertical': {video_title}")
 
         output_file = os.path.join(
-            VIDEO_PATH, f"{video_title}.mp4")  # Set output file name
+            output_dir, f"{video_title}.mp4")  # Set output file name
 
         # Update the output template to include the video title
         ydl_opts['outtmpl'] = output_file
@@ -130,33 +147,36 @@ def download_full_video(video_url):
         return output_file
 
 
-def download_random_full_video():
+def download_random_full_video(max_attempts=5):
     """
     Downloads a random full-length video from a YouTube channel, retrying on failure.
+
+    The channel is only listed once, and each attempt picks a video that has not
+    been tried yet.
+
+    Args:
+        max_attempts (int): The number of videos to try before giving up.
+
+    Returns:
+        str: The path to the downloaded video file, or None if every attempt failed.
     """
-    while (True):
+    entries = get_channel_entries(CHANNEL_URL)
+    random.shuffle(entries)
+    for entry in entries[:max_attempts]:
         try:
-            video_url = get_random_video_url(CHANNEL_URL)
-            download_full_video(video_url)
-            break
+            return download_full_video(entry['url'])
         except Exception as e:
             print(f"Failed with video: {e}")
             print("Trying another video...")
+    return None
 
 
 def main():
     """
     Main function to download a random video from a YouTube channel with retry logic.
     """
-    # Retry loop in case a video fails to download
-    while (True):
-        try:
-            video_url = get_random_video_url(CHANNEL_URL)
-            download_full_video(video_url)
-            break
-        except Exception as e:
-            print(f"Failed with video: {e}")
-            print("Trying another video...")
+    if download_random_full_video() is None:
+        print("❌ Could not download a background video.")
 
 
 if __name__ == "__main__":
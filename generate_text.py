@@ -1,7 +1,11 @@
 import json
 import os
+import random
 import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import requests
+import tiktoken
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -20,7 +24,10 @@ with open("italian_brainrot_words.txt", "r", encoding="utf-8") as f:
         if word:  # Only add non-empty lines
             italian_brainrot_words.append(word)
 
-SYSTEM_PROMPT: str = f"""Transform any input into expressive, emotionally-charged language with a light touch of brainrot and a sprinkle of Italian chaos:
+
+def build_system_prompt(definitions: dict) -> str:
+    """Builds the system prompt with the given brainrot definitions."""
+    return f"""Transform any input into expressive, emotionally-charged language with a light touch of brainrot and a sprinkle of Italian chaos:
 - **Do not refer to the transformation, style, or prompt itself. Never say things like “let’s break it down,” “here’s the chaotic version,” or “with Gen Z rizz.” Just output the transformed content as if that’s the speaker’s natural voice**.
 - *Do not generate any emojies*
 - Rewrite the input to sound **more exaggerated, impulsive, or emotionally intense**, while **keeping its meaning clear**.
@@ -41,7 +48,7 @@ Example Output:
 
 Brainrot Definitions:
 
-{chr(10).join([f"- {word}: {definition}" for word, definition in brainrot_words_with_definitions.items()])}
+{chr(10).join([f"- {word}: {definition}" for word, definition in definitions.items()])}
 
 Italian Brainrot Words to throw in randomly:
 
@@ -49,6 +56,9 @@ Italian Brainrot Words to throw in randomly:
 """
 
 
+SYSTEM_PROMPT: str = build_system_prompt(brainrot_words_with_definitions)
+
+
 def strip_markdown(text):
     # Remove bold/italic markers
     text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
@@ -67,23 +77,176 @@ def strip_markdown(text):
     return text
 
 
-def createText(input_file_path: str, output_file_dir: str) -> str:
+# DeepSeek api models
+MODEL_V3 = "deepseek/deepseek-v3-base:free"
+MODEL_R1 = "deepseek/deepseek-r1:free"
+MODEL_R3 = "deepseek/deepseek-chat:free"
 
-    # DeepSeek api models
-    MODEL_V3 = "deepseek/deepseek-v3-base:free"
-    MODEL_R1 = "deepseek/deepseek-r1:free"
-    MODEL_R3 = "deepseek/deepseek-chat:free"
+TOKEN_BUDGET = 16000  # Tokens one request may use: system prompt, input and output
+CHUNK_TOKENS = 1000  # Largest input chunk sent in one request
+MIN_CHUNK_TOKENS = 200  # Smallest chunk worth a request of its own
+MAX_WORKERS = 4  # Chunks transformed at the same time
 
-    api = os.environ.get("OPEN_ROUTER_API", "").strip()
-    if not api:
-        raise ValueError("OPEN_ROUTER_API environment variable not set.")
+PROMPT_MODE = "relevant"  # Which definitions go in the prompt, see select_definitions
+PROMPT_TOKEN_BUDGET = 1500  # Tokens the definitions may take up in the prompt
+RANDOM_PROMPT_VARIANTS = 4  # Precomputed random definition subsets
 
-    # Read user input from input.txt
-    with open(input_file_path, "r", encoding="utf-8") as f:
-        user_input = f.read().strip()
 
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Loads the encoding once. A failed load is cached as None so it is not retried on every call."""
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Estimates the number of tokens in `text`.
+
+    DeepSeek uses its own tokenizer, so the cl100k_base count is only an estimate.
+    Falls back to ~4 characters per token when the encoding cannot be loaded.
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+@lru_cache(maxsize=1)
+def _definition_tokens() -> dict:
+    """Token count of every definition line in the prompt, computed once."""
+    return {
+        word: count_tokens(f"- {word}: {definition}\n")
+        for word, definition in brainrot_words_with_definitions.items()
+    }
+
+
+@lru_cache(maxsize=64)
+def get_system_prompt(words: tuple = None) -> tuple:
+    """Builds and caches the system prompt for a subset of definitions.
+
+    Args:
+        words: The brainrot words whose definitions are included, or None for all of them.
+
+    Returns:
+        The prompt and its estimated token count.
+    """
+    if words is None:
+        definitions = brainrot_words_with_definitions
+    else:
+        definitions = {word: brainrot_words_with_definitions[word] for word in words}
+    prompt = build_system_prompt(definitions)
+    return prompt, count_tokens(prompt)
+
+
+@lru_cache(maxsize=16)
+def _random_subsets(token_budget: int) -> list:
+    """Precomputes a few random definition subsets that fit in `token_budget`.
+
+    Requests pick one of these instead of drawing a fresh subset, so their
+    prompts stay cached.
+    """
+    subsets = []
+    tokens = _definition_tokens()
+    for seed in range(RANDOM_PROMPT_VARIANTS):
+        words = list(brainrot_words_with_definitions)
+        random.Random(seed).shuffle(words)
+        subsets.append(_fill_budget([], words, tokens, token_budget))
+    return subsets
+
+
+def _fill_budget(chosen: list, candidates: list, tokens: dict, token_budget: int) -> tuple:
+    """Adds candidates to `chosen` while they fit in the budget, keeping file order."""
+    chosen = list(chosen)
+    used = sum(tokens[word] for word in chosen)
+    for word in candidates:
+        if word in chosen:
+            continue
+        if used + tokens[word] > token_budget:
+            continue
+        chosen.append(word)
+        used += tokens[word]
+    order = {word: i for i, word in enumerate(brainrot_words_with_definitions)}
+    return tuple(sorted(chosen, key=order.get))
+
+
+def select_definitions(user_input: str, mode: str = PROMPT_MODE, token_budget: int = PROMPT_TOKEN_BUDGET) -> tuple:
+    """Chooses which brainrot definitions go into the system prompt.
+
+    Args:
+        user_input: The text that will be transformed.
+        mode: "full" for every definition, "random" for one of the precomputed
+            random subsets, or "relevant" for the words that appear in the input,
+            topped up from a random subset.
+        token_budget: The tokens the definitions may take up in the prompt.
+
+    Returns:
+        The selected words, or None for every definition.
+    """
+    if mode == "full":
+        return None
+
+    subset = random.choice(_random_subsets(token_budget))
+    if mode == "random":
+        return subset
+    if mode != "relevant":
+        raise ValueError(f"Unknown prompt mode: {mode}")
+
+    lowered = user_input.lower()
+    relevant = [
+        word for word in brainrot_words_with_definitions
+        if re.search(r'\b' + re.escape(word.lower()) + r'\b', lowered)
+    ]
+    return _fill_budget([], relevant + list(subset), _definition_tokens(), token_budget)
+
+
+def split_into_chunks(text: str, max_tokens: int) -> list:
+    """Splits text into chunks of at most `max_tokens`, breaking at paragraph boundaries.
+
+    Paragraphs that are too long on their own are split between sentences. A single
+    sentence longer than `max_tokens` is kept whole.
+    """
+    # (paragraph number, text) so sentences of one paragraph are joined back with spaces
+    pieces = []
+    for number, paragraph in enumerate(re.split(r'\n\s*\n', text)):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) <= max_tokens:
+            pieces.append((number, paragraph))
+        else:
+            pieces.extend((number, sentence)
+                          for sentence in re.split(r'(?<=[.!?])\s+', paragraph))
+
+    chunks = []
+    current = ""
+    current_tokens = 0
+    previous_number = None
+    for number, piece in pieces:
+        piece_tokens = count_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append(current)
+            current = ""
+            current_tokens = 0
+        if current:
+            current += " " if number == previous_number else "\n\n"
+        current += piece
+        current_tokens += piece_tokens
+        previous_number = number
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _requestBrainrot(user_input: str, api: str, http, system_prompt: str = SYSTEM_PROMPT) -> str:
+    """Sends one input to the model and returns the transformed text with markdown stripped.
+
+    Raises:
+        ValueError: If the API returns an error.
+    """
     # Request Deepseek to convert input to brainrot
-    response = requests.post(
+    response = http.post(
         url="https://openrouter.ai/api/v1/chat/completions",
         headers={
             "Authorization": "Bearer " + api,
@@ -94,7 +257,7 @@ def createText(input_file_path: str, output_file_dir: str) -> str:
             "messages": [
                 {
                     "role": "system",
-                    "content": SYSTEM_PROMPT
+                    "content": system_prompt
                 },
                 {
                     "role": "user",
@@ -106,34 +269,16 @@ def createText(input_file_path: str, output_file_dir: str) -> str:
 
     result = response.json()
 
+    if "usage" in result and result["usage"]:
+        print(f"🔢 Model reported {result['usage'].get('prompt_tokens')} prompt tokens")
+
     # Retrieve the content
     if (
         "choices" in result and result["choices"] and
         "message" in result["choices"][0] and
         "content" in result["choices"][0]["message"]
     ):
-        message = strip_markdown(result["choices"][0]["message"]["content"])
-
-        # Ensure output directory exists
-        os.makedirs(output_file_dir, exist_ok=True)
-
-        # Scan existing output_*.txt files
-        existing_files = os.listdir(output_file_dir)
-        output_numbers = [
-            int(match.group(1)) for f in existing_files
-            if (match := re.match(r"output_(\d+)\.txt", f))
-        ]
-        next_number = max(output_numbers, default=0) + 1
-
-        output_path = os.path.join(
-            output_file_dir, f"output_{next_number}.txt")
-
-        # Save the brainrot text
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(message)
-
-        print(f"✅ Text saved to: {output_path}")
-        return output_path
+        return strip_markdown(result["choices"][0]["message"]["content"])
 
     # Error handling - result returns and error
     elif (
@@ -147,6 +292,97 @@ def createText(input_file_path: str, output_file_dir: str) -> str:
             f"{result['error']['message']}: ({result['error']['code']})")
 
 
+def createText(input_file_path: str, output_file_dir: str, session: requests.Session = None, token_budget: int = TOKEN_BUDGET, chunk_tokens: int = CHUNK_TOKENS, max_workers: int = MAX_WORKERS, prompt_mode: str = PROMPT_MODE, prompt_token_budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """Transforms the contents of `input_file_path` into brainrot text.
+
+    Long inputs are split at paragraph boundaries, the chunks are transformed
+    concurrently and the results are joined back in order. Chunking starts when
+    the input is longer than `chunk_tokens`, or when the system prompt, input and
+    expected output would not fit in `token_budget`.
+
+    Args:
+        input_file_path: The path to the input file containing the text to transform.
+        output_file_dir: The directory where the brainrot text file will be saved.
+        session: Optional `requests.Session` to reuse pooled HTTP connections
+            across calls. A one-off connection is used when omitted.
+        token_budget: The estimated tokens one request may use.
+        chunk_tokens: The largest input, in tokens, sent in one request.
+        max_workers: The number of chunks transformed at the same time.
+        prompt_mode: Which definitions go in the system prompt ("full", "random"
+            or "relevant"), see `select_definitions`.
+        prompt_token_budget: The tokens the definitions may take up in the prompt.
+
+    Returns:
+        The path to the saved brainrot text file.
+
+    Raises:
+        ValueError: If the API key is missing, the system prompt leaves too little
+            of `token_budget` for the input, or the API returns an error.
+    """
+
+    api = os.environ.get("OPEN_ROUTER_API", "").strip()
+    if not api:
+        raise ValueError("OPEN_ROUTER_API environment variable not set.")
+
+    # Read user input from input.txt
+    with open(input_file_path, "r", encoding="utf-8") as f:
+        user_input = f.read().strip()
+
+    # Every chunk of the job shares one prompt so the stitched text keeps one voice
+    system_prompt, prompt_tokens = get_system_prompt(
+        select_definitions(user_input, prompt_mode, prompt_token_budget))
+
+    def transform(text: str, http) -> str:
+        print(f"🔢 Prompt: {prompt_tokens} tokens, input: {count_tokens(text)} tokens")
+        return _requestBrainrot(text, api, http, system_prompt)
+
+    # The output is roughly as long as the input, so reserve the same again for it
+    input_tokens = count_tokens(user_input)
+    room = (token_budget - prompt_tokens) // 2
+    if room < MIN_CHUNK_TOKENS:
+        raise ValueError(
+            f"The system prompt ({prompt_tokens} tokens) leaves no room for input in a "
+            f"{token_budget} token budget. Raise the budget or use a smaller prompt.")
+    chunk_limit = min(chunk_tokens, room)
+
+    if input_tokens <= chunk_limit:
+        http = session if session is not None else requests
+        message = transform(user_input, http)
+    else:
+        chunks = split_into_chunks(user_input, chunk_limit)
+        print(f"✂️ Splitting input into {len(chunks)} chunks")
+        http = session if session is not None else requests.Session()
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(
+                    lambda chunk: transform(chunk, http), chunks)
+                message = "\n\n".join(results)
+        finally:
+            if session is None:
+                http.close()
+
+    # Ensure output directory exists
+    os.makedirs(output_file_dir, exist_ok=True)
+
+    # Scan existing output_*.txt files
+    existing_files = os.listdir(output_file_dir)
+    output_numbers = [
+        int(match.group(1)) for f in existing_files
+        if (match := re.match(r"output_(\d+)\.txt", f))
+    ]
+    next_number = max(output_numbers, default=0) + 1
+
+    output_path = os.path.join(
+        output_file_dir, f"output_{next_number}.txt")
+
+    # Save the brainrot text
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(message)
+
+    print(f"✅ Text saved to: {output_path}")
+    return output_path
+
+
 if __name__ == "__main__":
     input_file_path = "input.txt"
     output_brainrot_text_dir = "output/brainrot_texts"
@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import os
 import sys
@@ -5,7 +6,9 @@ import time
 from generate_text import createText
 from generate_audio import generateAudio
 from make_subtitles import generateSubtitlesSSA
-from make_video import make_video_with_subs
+from make_video import VIDEO_DIR, make_video_with_subs
+from stream_render import render_incremental
+from video_library import get_library
 
 
 def clear_console():
@@ -117,7 +120,7 @@ async def _generateSubtitiles(audio_file_path: str, brainrot_text_path: str) ->
     return subtitle_file_path
 
 
-def _generateFinalVideo(audio_file_path: str, subtitle_file_path: str) -> str:
+def _generateFinalVideo(audio_file_path: str, subtitle_file_path: str, seed=None) -> str:
     """Combines the audio, subtitles, and a background video into a final video.
 
     This function calls the `make_video_with_subs` function to merge the provided
@@ -127,6 +130,7 @@ def _generateFinalVideo(audio_file_path: str, subtitle_file_path: str) -> str:
     Args:
         audio_file_path: The path to the audio file to be included in the final video.
         subtitle_file_path: The path to the SSA subtitle file to be overlaid on the final video.
+        seed: Optional seed that pins the background clip selection.
 
     Returns:
         The path to the generated final video file.
@@ -135,7 +139,7 @@ def _generateFinalVideo(audio_file_path: str, subtitle_file_path: str) -> str:
     start = time.time()
     print("🎞️ Creating final video...")
     final_video_path = make_video_with_subs(
-        audio_file_path, subtitle_file_path)
+        audio_file_path, subtitle_file_path, seed=seed)
     end = time.time()
     if final_video_path == None:
         sys.exit(0)
@@ -144,27 +148,90 @@ def _generateFinalVideo(audio_file_path: str, subtitle_file_path: str) -> str:
     return final_video_path
 
 
+async def _generateIncrementalVideo(output_audio_dir: str, brainrot_text_path: str, seed=None) -> str:
+    """Generates the audio, subtitles and final video in one overlapping pass.
+
+    This asynchronous function calls the `render_incremental` function, which
+    encodes the video in segments while the audio is still being generated.
+
+    Args:
+        output_audio_dir: The directory where the generated audio file will be saved.
+        brainrot_text_path: The path to the brainrot text file to be converted to video.
+        seed: Optional seed that pins the background clip selection.
+
+    Returns:
+        The path to the generated final video file.
+    """
+    # ⏱️ Make final video while narrating
+    start = time.time()
+    print("🎞️ Creating final video while generating audio...")
+    final_video_path = await render_incremental(
+        brainrot_text_path, output_audio_dir, seed=seed)
+    end = time.time()
+    if final_video_path == None:
+        sys.exit(0)
+    print(f"Final video created in {end - start:.2f}s\n")
+
+    return final_video_path
+
+
+def _prepareBackgroundVideos():
+    """Makes sure there is a background video to render with and starts topping up the library.
+
+    When the library is empty the user is asked whether to download a video from
+    YouTube before anything else runs, so the render never waits on a download.
+
+    Raises:
+        FileNotFoundError: If the library is empty and the user declines or the download fails.
+    """
+    library = get_library(VIDEO_DIR)
+    if not library.videos():
+        user_choice = input(
+            "❓ Do you want to download a YouTube video instead? (y/N): ").strip().lower()
+        print("")
+        # Download a single video now; the background thread fetches the rest
+        if user_choice != 'y' or not library.fill(max_attempts=5, target_size=1):
+            raise FileNotFoundError("No video files found in directory.")
+    library.start()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Turn input.txt into a narrated, subtitled brainrot video.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Encode the video while the narration is still being generated.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Pins the background clip, so a re-render reuses the same clip range and its cached trim.")
+    return parser.parse_args()
+
+
 async def main():
+    args = _parse_args()
     input_file_path = "input.txt"
     output_audio_dir = "output/audio"
     output_brainrot_text_dir = "output/brainrot_texts"
     try:
         os.makedirs(output_audio_dir, exist_ok=True)
         clear_console()
+        _prepareBackgroundVideos()
 
         start = time.time()
 
         brainrot_text_path: str = _generateText(
             input_file_path, output_brainrot_text_dir)
 
-        audio_file_path: str = await _generateAudio(
-            output_audio_dir, brainrot_text_path)
+        if args.incremental:
+            final_video_path: str = await _generateIncrementalVideo(
+                output_audio_dir, brainrot_text_path, args.seed)
+        else:
+            audio_file_path: str = await _generateAudio(
+                output_audio_dir, brainrot_text_path)
 
-        subtitle_file_path: str = await _generateSubtitiles(
-            audio_file_path, brainrot_text_path)
+            subtitle_file_path: str = await _generateSubtitiles(
+                audio_file_path, brainrot_text_path)
 
-        final_video_path: str = _generateFinalVideo(
-            audio_file_path, subtitle_file_path)
+            final_video_path: str = _generateFinalVideo(
+                audio_file_path, subtitle_file_path, args.seed)
 
         end = time.time()
         print(
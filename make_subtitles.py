@@ -45,7 +45,78 @@ def find_best_match(current_word: str, context_words: list) -> Tuple[str, int]:
     return best_match, best_index
 
 
-def generateSubtitlesSSA(audio_file_path: str, text_file_path: str, special_words: bool = True) -> str:
+SUBTITLE_DIR = "output/subtitles"
+
+# The Karaoke style hides words until they are spoken: \ko draws a word in the
+# fully transparent SecondaryColour (and without outline) until its turn.
+SSA_HEADER = """[Script Info]
+Title: Custom Matched Subtitles
+ScriptType: v4.00+
+PlayResX: 640
+PlayResY: 360
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,52,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,-1,0,0,0,100,100,4,0,1,3,0,2,10,10,20,1
+Style: Karaoke,Arial,52,&H00FFFFFF,&HFF000000,&H00000000,&H00000000,-1,0,0,0,100,100,4,0,1,3,0,2,10,10,20,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+WORDS_PER_EVENT = 4  # Words grouped into one Dialogue event
+MAX_WORD_GAP = 0.6  # Seconds of silence that start a new event
+
+
+def group_words(timed_words: list, words_per_event: int = WORDS_PER_EVENT, max_gap: float = MAX_WORD_GAP) -> list:
+    """Splits (start, end, text) words into phrases of at most `words_per_event` words, breaking on pauses."""
+    groups = []
+    current = []
+    for word in timed_words:
+        if current and (len(current) >= words_per_event or word[0] - current[-1][1] > max_gap):
+            groups.append(current)
+            current = []
+        current.append(word)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def build_ssa_events(timed_words: list, words_per_event: int = WORDS_PER_EVENT, karaoke: bool = True, max_gap: float = MAX_WORD_GAP) -> list:
+    """
+    Builds Dialogue lines for timed words, one event per phrase instead of one per word.
+
+    Args:
+        timed_words: (start, end, text) tuples in seconds, in spoken order.
+        words_per_event: The maximum number of words in one event. 1 emits an event per word.
+        karaoke: Reveal the words of a phrase one by one with \\ko tags. Without it,
+            the whole phrase is shown for its duration.
+        max_gap: Seconds of silence between two words that start a new event.
+
+    Returns:
+        The Dialogue lines, in time order.
+    """
+    events = []
+    for group in group_words(timed_words, words_per_event, max_gap):
+        start_ssa = format_ssa_time(group[0][0])
+        end_ssa = format_ssa_time(group[-1][1])
+
+        if karaoke and len(group) > 1:
+            parts = []
+            for i, (start, end, text) in enumerate(group):
+                # Each word stays hidden until the previous ones have been spoken
+                until = group[i + 1][0] if i + 1 < len(group) else end
+                parts.append(f"{{\\ko{max(1, round((until - start) * 100))}}}{text}")
+            events.append(
+                f"Dialogue: 0,{start_ssa},{end_ssa},Karaoke,,0,0,0,,{' '.join(parts)}")
+        else:
+            text = " ".join(word[2] for word in group)
+            events.append(
+                f"Dialogue: 0,{start_ssa},{end_ssa},Default,,0,0,0,,{text}")
+    return events
+
+
+def generateSubtitlesSSA(audio_file_path: str, text_file_path: str, special_words: bool = True, model=None, output_dir: str = SUBTITLE_DIR, words_per_event: int = WORDS_PER_EVENT, karaoke: bool = True) -> str:
     """
     Generates SSA subtitles from an audio file and a text file, incorporating custom matching logic.
 
@@ -53,6 +124,11 @@ def generateSubtitlesSSA(audio_file_path: str, text_file_path: str, special_word
         audio_file_path: Path to the audio file.
         text_file_path: Path to the text file.
         special_words: Flag to enable special word matching logic.
+        model: Optional pre-loaded Whisper model. The "base" model is loaded
+            when omitted.
+        output_dir: The directory where the SSA file will be saved.
+        words_per_event: The maximum number of words grouped into one subtitle event.
+        karaoke: Reveal grouped words one at a time as they are spoken.
 
     Returns:
         Path to the generated SSA subtitle file.
@@ -60,10 +136,10 @@ def generateSubtitlesSSA(audio_file_path: str, text_file_path: str, special_word
     Raises:
         FileNotFoundError: If the audio file or text file does not exist.
     """
-    SUBTITLE_DIR = "output/subtitles"
-    os.makedirs(SUBTITLE_DIR, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
 
-    model = whisper.load_model("base")
+    if model is None:
+        model = whisper.load_model("base")
     transcript = model.transcribe(audio_file_path, word_timestamps=True)
 
     lines = ""
@@ -86,26 +162,11 @@ def generateSubtitlesSSA(audio_file_path: str, text_file_path: str, special_word
     base_name = "subtitle_"
     ext = ".ssa"
     counter = 1
-    while os.path.exists(os.path.join(SUBTITLE_DIR, f"{base_name}{counter}{ext}")):
+    while os.path.exists(os.path.join(output_dir, f"{base_name}{counter}{ext}")):
         counter += 1
-    ssa_path = os.path.join(SUBTITLE_DIR, f"{base_name}{counter}{ext}")
-
-    # SSA header
-    header = """[Script Info]
-Title: Custom Matched Subtitles
-ScriptType: v4.00+
-PlayResX: 640
-PlayResY: 360
+    ssa_path = os.path.join(output_dir, f"{base_name}{counter}{ext}")
 
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Default,Arial,52,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,-1,0,0,0,100,100,4,0,1,3,0,2,10,10,20,1
-
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-"""
-
-    events = []
+    timed_words = []
     list_index = 0
 
     for segment in transcript['segments']:
@@ -141,14 +202,13 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 
                 list_index += 1
 
-            start_ssa = format_ssa_time(start_time)
-            end_ssa = format_ssa_time(end_time)
-            events.append(
-                f"Dialogue: 0,{start_ssa},{end_ssa},Default,,0,0,0,,{word_text}")
+            timed_words.append((start_time, end_time, word_text.strip()))
+
+    events = build_ssa_events(timed_words, words_per_event, karaoke)
 
     try:
         with open(ssa_path, 'w', encoding='utf-8') as ssa_file:
-            ssa_file.write(header)
+            ssa_file.write(SSA_HEADER)
             ssa_file.write("\n".join(events))
     except FileNotFoundError as e:
         print(f"{ssa_path} cannot be found")
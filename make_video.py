@@ -1,7 +1,7 @@
 import os
-import random
 import subprocess
-from generate_bg_video import download_random_full_video
+import tempfile
+from video_library import get_library
 from pydub.utils import mediainfo  # type: ignore
 
 
@@ -9,56 +9,49 @@ VIDEO_DIR = "output/background_videos"
 OUTPUT_PATH = "output/brainrot_videos"
 TRIMMED_VIDEO_DIR = "output/trimmed_videos"
 
+# Outputs rendered for publishing: the full video, a smaller copy, a low-res
+# preview and a thumbnail sprite sheet
+PUBLISH_VARIANTS = [
+    {"name": "main", "resolution": "1080x1920"},
+    {"name": "720p", "resolution": "720x1280", "video_bitrate": "2500k"},
+    {"name": "preview", "resolution": "270x480", "crf": 32, "preset": "veryfast"},
+    {"name": "sprite", "kind": "sprite", "resolution": "108x192", "tile": "5x4"},
+]
+
 
 def get_audio_duration(audio_path):
     info = mediainfo(audio_path)
     return float(info['duration'])
 
 
-def get_video_duration(video_path):
-    info = mediainfo(video_path)
-    return float(info['duration'])
-
-
-def get_random_video(video_dir):
-    video_files = [f for f in os.listdir(
-        video_dir) if f.lower().endswith((".mp4", ".mov", ".mkv"))]
-    if not video_files:
-        user_choice = input(
-            "❓ Do you want to download a YouTube video instead? (y/N): ").strip().lower()
-        if user_choice == 'y':
-            download_random_full_video()
-            video_files = [f for f in os.listdir(
-                video_dir) if f.lower().endswith((".mp4", ".mov", ".mkv"))]
-        else:
-            raise FileNotFoundError("No video files found in directory.")
-    return os.path.join(video_dir, random.choice(video_files))
-
-
-def trim_video_random(video_path, audio_duration, output_path):
-    video_duration = get_video_duration(video_path)
-    if audio_duration >= video_duration:
-        raise ValueError("Audio is longer than video. Cannot trim.")
-
-    max_start = video_duration - audio_duration
-    start_time = round(random.uniform(0, max_start), 2)
-
+def trim_video(video_path, start_time, duration, output_path):
+    # Trim to a temporary file so a failed or interrupted trim never leaves a partial output,
+    # and concurrent trims of the same range never write to the same file
+    fd, temp_path = tempfile.mkstemp(
+        suffix=".tmp.mp4", dir=os.path.dirname(output_path) or ".")
+    os.close(fd)
     ffmpeg_cmd = [
         "ffmpeg",
         "-hide_banner",
         "-loglevel", "error",
         "-ss", str(start_time),
         "-i", video_path,
-        "-t", str(audio_duration),
+        "-t", str(duration),
         "-c", "copy",
-        output_path
+        "-y",
+        temp_path
     ]
 
-    subprocess.run(ffmpeg_cmd, check=True)
+    try:
+        subprocess.run(ffmpeg_cmd, check=True)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
     print(f"🎬 Trimmed video saved to {output_path}")
 
 
-def make_video_with_subs(audio_path: str, subtitle_path: str, resolution="1080x1920", font_size=24, file_name=None) -> str:
+def make_video_with_subs(audio_path: str, subtitle_path: str, resolution="1080x1920", font_size=24, file_name=None, output_dir: str = OUTPUT_PATH, seed=None, work_dir: str = TRIMMED_VIDEO_DIR) -> str:
     """
     Combines an audio file, subtitle file, and a randomly selected video into a final video with subtitles.
 
@@ -68,77 +61,162 @@ def make_video_with_subs(audio_path: str, subtitle_path: str, resolution="1080x1
         resolution: The desired resolution of the output video (e.g., "1080x1920").
         font_size: The font size for the subtitles.
         file_name: The desired name for the output video file. If None, a dynamic name is generated.
+        output_dir: The directory where the final video will be saved.
+        seed: Optional seed that pins the background clip selection. Re-rendering with the
+            same seed reuses the same clip range and its cached trimmed video.
+        work_dir: The directory where the trimmed background video is written.
 
     Returns:
         Path to the generated final video file, or None if an error occurred.
     """
+    outputs = make_video_variants(
+        audio_path, subtitle_path, [{"name": "main", "resolution": resolution}],
+        resolution=resolution, font_size=font_size, file_name=file_name,
+        output_dir=output_dir, seed=seed, work_dir=work_dir)
+    return outputs["main"] if outputs else None
+
+
+def _variant_filters(variant: dict, input_label: str, output_label: str, duration: float) -> str:
+    """Builds the filter chain that turns the subtitled master stream into one variant."""
+    width, height = map(int, variant["resolution"].split('x'))
+    if variant.get("kind") == "sprite":
+        columns, rows = map(int, variant.get("tile", "5x4").split('x'))
+        # Spread the sprite frames evenly over the whole video
+        interval = max(duration / (columns * rows), 0.1)
+        return (f"[{input_label}]fps=1/{interval:.3f},scale={width}:{height},"
+                f"tile={columns}x{rows}[{output_label}]")
+    return (f"[{input_label}]scale={width}:{height}:force_original_aspect_ratio=increase,"
+            f"crop={width}:{height}[{output_label}]")
+
+
+def make_video_variants(audio_path: str, subtitle_path: str, variants: list = PUBLISH_VARIANTS, resolution="1080x1920", font_size=24, file_name=None, output_dir: str = OUTPUT_PATH, seed=None, work_dir: str = TRIMMED_VIDEO_DIR) -> dict:
+    """
+    Renders several outputs from a single decode of the background video.
+
+    The background is decoded, cropped and subtitled once at `resolution`, then split
+    to one encoder per variant inside the same FFmpeg run.
+
+    Args:
+        audio_path: Path to the audio file.
+        subtitle_path: Path to the SSA subtitle file.
+        variants: Output descriptions. Each is a dict with a "name" and a "resolution", and
+            optionally "video_bitrate", "crf" and "preset" for videos, or "kind": "sprite"
+            and a "tile" layout (e.g. "5x4") for a thumbnail sprite sheet.
+        resolution: The resolution the subtitles are rendered at before scaling to each variant.
+        font_size: The font size for the subtitles.
+        file_name: The name of the "main" variant. Other variants add their name as a suffix.
+            If None, a dynamic name is generated.
+        output_dir: The directory where the outputs will be saved.
+        seed: Optional seed that pins the background clip selection.
+        work_dir: The directory where the trimmed background video is written. Each
+            render gets its own file, so concurrent renders can share the directory.
+
+    Returns:
+        A dict mapping each variant name to its output path, or None if an error occurred.
+    """
 
-    os.makedirs(OUTPUT_PATH, exist_ok=True)
-    os.makedirs(TRIMMED_VIDEO_DIR, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(work_dir, exist_ok=True)
+    trimmed_video_path = None
 
     try:
         # Generate dynamic final output filename if not provided
         if file_name is None:
             base_name = "brainrot_"
             counter = 1
-            while os.path.exists(os.path.join(OUTPUT_PATH, f"{base_name}{counter}.mp4")):
+            while os.path.exists(os.path.join(output_dir, f"{base_name}{counter}.mp4")):
                 counter += 1
             file_name = f"{base_name}{counter}.mp4"
-
-        # Generate dynamic trimmed video filename
-        trimmed_base = "trimmed_"
-        trimmed_counter = 1
-
-        while os.path.exists(os.path.join(TRIMMED_VIDEO_DIR, f"{trimmed_base}{trimmed_counter}.mp4")):
-            trimmed_counter += 1
-
-        trimmed_video_filename = f"{trimmed_base}{trimmed_counter}.mp4"
-        trimmed_video_path = os.path.join(
-            TRIMMED_VIDEO_DIR, trimmed_video_filename)
-
-        final_output_path = os.path.join(OUTPUT_PATH, file_name)
-
-        # Pick random video and get audio duration
-        random_video = get_random_video(VIDEO_DIR)
+        stem = os.path.splitext(file_name)[0]
+
+        output_paths = {}
+        for variant in variants:
+            if variant["name"] == "main":
+                output_paths["main"] = os.path.join(output_dir, file_name)
+            else:
+                ext = ".jpg" if variant.get("kind") == "sprite" else ".mp4"
+                output_paths[variant["name"]] = os.path.join(
+                    output_dir, f"{stem}_{variant['name']}{ext}")
+
+        # Pick the least used background range for the audio duration
         duration = get_audio_duration(audio_path)
-
-        # Trim the video
-        trim_video_random(random_video, duration, trimmed_video_path)
+        library = get_library(VIDEO_DIR)
+        library.start()
+        background_video, start_time = library.select_clip(duration, seed)
+
+        if seed is None:
+            # A unique name, so concurrent renders never trim into the same file
+            fd, trimmed_video_path = tempfile.mkstemp(
+                prefix="trimmed_", suffix=".mp4", dir=work_dir)
+            os.close(fd)
+            trim_video(background_video, start_time,
+                       duration, trimmed_video_path)
+        else:
+            # Seeded renders keep their trimmed video so a re-render can skip trimming
+            trimmed_video_path = library.trim_cache_path(
+                background_video, start_time, duration)
+            if os.path.exists(trimmed_video_path):
+                print(f"♻️ Reusing trimmed video: {trimmed_video_path}")
+            else:
+                trim_video(background_video, start_time,
+                           duration, trimmed_video_path)
 
         subtitle_path = os.path.normpath(subtitle_path)
 
         # *** ENSURE subtitle_path is correct ***
         if not os.path.exists(subtitle_path):
-            raise (f"Subtitle file not found at: {subtitle_path}")
+            raise FileNotFoundError(f"Subtitle file not found at: {subtitle_path}")
 
         subtitle_path_ffmpeg = subtitle_path.replace('\\', '/')
         width, height = map(int, resolution.split('x'))
 
+        # Decode, crop and burn in subtitles once, then fan out to every variant
+        filters = [
+            f"[0:v]scale=-1:{height},crop={width}:{height},subtitles='{subtitle_path_ffmpeg}':force_style='FontSize={font_size},Alignment=10,MarginV=0',"
+            f"split={len(variants)}" + "".join(f"[s{i}]" for i in range(len(variants))),
+        ]
+        video_count = sum(1 for v in variants if v.get("kind") != "sprite")
+        if video_count:
+            filters.append(
+                "[0:a][1:a]amix=inputs=2:duration=first:dropout_transition=2,"
+                f"asplit={video_count}" + "".join(f"[a{i}]" for i in range(video_count)))
+        for i, variant in enumerate(variants):
+            filters.append(_variant_filters(variant, f"s{i}", f"v{i}", duration))
+
         ffmpeg_cmd = [
             "ffmpeg",
             "-hide_banner",
             "-loglevel", "error",
             "-i", trimmed_video_path,
             "-i", audio_path,
-            "-filter_complex", "[0:a][1:a]amix=inputs=2:duration=first:dropout_transition=2[aout]",
-            "-vf", f"scale=-1:{height},crop={width}:{height},subtitles='{subtitle_path_ffmpeg}':force_style='FontSize={font_size},Alignment=10,MarginV=0'",
-            "-map", "0:v:0",
-            "-map", "[aout]",
-            "-c:v", "libx264",
-            "-c:a", "aac",
-            "-shortest",
-            final_output_path,
+            "-filter_complex", ";".join(filters),
         ]
 
-        subprocess.run(ffmpeg_cmd, check=True)
+        audio_index = 0
+        for i, variant in enumerate(variants):
+            ffmpeg_cmd += ["-map", f"[v{i}]"]
+            if variant.get("kind") == "sprite":
+                ffmpeg_cmd += ["-frames:v", "1", "-update", "1"]
+            else:
+                ffmpeg_cmd += ["-map", f"[a{audio_index}]",
+                               "-c:v", "libx264", "-c:a", "aac"]
+                audio_index += 1
+                if "preset" in variant:
+                    ffmpeg_cmd += ["-preset", variant["preset"]]
+                if "crf" in variant:
+                    ffmpeg_cmd += ["-crf", str(variant["crf"])]
+                if "video_bitrate" in variant:
+                    ffmpeg_cmd += ["-b:v", variant["video_bitrate"],
+                                   "-maxrate", variant["video_bitrate"],
+                                   "-bufsize", variant["video_bitrate"]]
+                ffmpeg_cmd += ["-shortest"]
+            ffmpeg_cmd.append(output_paths[variant["name"]])
 
-        # Remove the trimmed video file
-        if os.path.exists(trimmed_video_path):
-            os.remove(trimmed_video_path)
-            print(f"🗑️ Removed trimmed video: {trimmed_video_path}")
+        subprocess.run(ffmpeg_cmd, check=True)
 
-        print(f"✅ Final video created: {final_output_path}")
-        return final_output_path
+        for path in output_paths.values():
+            print(f"✅ Final video created: {path}")
+        return output_paths
 
     except FileNotFoundError as e:
         print(f"Error: {e}")
@@ -146,3 +224,8 @@ def make_video_with_subs(audio_path: str, subtitle_path: str, resolution="1080x1
     except subprocess.CalledProcessError as e:
         print(f"FFmpeg error: {e}")
         return None
+    finally:
+        # Remove the trimmed video file
+        if seed is None and trimmed_video_path and os.path.exists(trimmed_video_path):
+            os.remove(trimmed_video_path)
+            print(f"🗑️ Removed trimmed video: {trimmed_video_path}")
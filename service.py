@@ -0,0 +1,486 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+
+import requests
+import whisper  # type: ignore
+from aiohttp import web
+from edge_tts import VoicesManager
+
+from generate_text import createText
+from generate_audio import generateAudio
+from make_subtitles import generateSubtitlesSSA
+from make_video import PUBLISH_VARIANTS, VIDEO_DIR, make_video_variants
+from video_library import get_library
+
+
+SERVICE_DIR = "output/service"
+DB_PATH = os.path.join(SERVICE_DIR, "jobs.sqlite3")
+JOBS_DIR = os.path.join(SERVICE_DIR, "jobs")
+POLL_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 30.0  # Seconds between lease renewals of a running job
+LEASE_TIMEOUT = 5 * 60.0  # Running jobs without a heartbeat for this long are requeued
+MAX_BACKOFF = 30.0  # Longest wait after a queue error
+
+# Number of jobs in flight per node, and how many of them may run each stage at once.
+# Subtitles share one Whisper model, so they default to a single worker.
+DEFAULT_WORKERS = {
+    "jobs": 2,
+    "text": 2,
+    "audio": 2,
+    "subtitles": 1,
+    "video": 1,
+}
+
+
+class LeaseLost(Exception):
+    """Raised when a worker finds that its job was handed to another worker."""
+
+
+async def _run_blocking(func, *args, **kwargs):
+    """Runs a blocking function in the default executor so the event loop stays responsive."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+class JobQueue:
+    """A job queue stored in SQLite.
+
+    Every call opens its own connection, so the queue can be used from worker
+    threads and shared by several service processes on the same machine. The
+    database runs in WAL mode, which does not work on network filesystems, so
+    the file must not be shared between machines.
+
+    A running job holds a lease that its worker renews with `heartbeat`. Jobs
+    whose lease has expired, e.g. because their process crashed, are put back
+    in the queue by `claim`. Updates to a running job only apply while the
+    given worker still holds it, so a worker that lost its lease cannot
+    overwrite the job of its successor.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    input_text TEXT NOT NULL,
+                    artifacts TEXT NOT NULL DEFAULT '{}',
+                    error TEXT,
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    heartbeat_at REAL,
+                    seed INTEGER
+                )""")
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "heartbeat_at" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            if "seed" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN seed INTEGER")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, input_text: str, seed: int = None) -> str:
+        """Adds a job to the queue and returns its id.
+
+        A `seed` pins the background clip, so jobs with the same seed reuse its cached trim.
+        """
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, input_text, created_at, seed) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, input_text, time.time(), seed))
+        return job_id
+
+    def claim(self, worker: str, lease_timeout: float = LEASE_TIMEOUT) -> dict:
+        """Atomically marks the oldest queued job as running and returns it, or None if the queue is empty.
+
+        Running jobs whose last heartbeat is older than `lease_timeout` are requeued first.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = NULL, worker = NULL "
+                "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ?",
+                (now - lease_timeout,))
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker, now, now, row["id"]))
+            conn.execute("COMMIT")
+            return self._to_dict(row)
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _update_running(self, job_id: str, worker: str, assignments: str, params: tuple) -> bool:
+        """Updates a job that `worker` is running. Returns False if the worker no longer holds it."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND worker = ? AND status = 'running'",
+                (*params, job_id, worker))
+            return cursor.rowcount > 0
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """Renews the lease of a running job. Returns False if the worker no longer holds it."""
+        return self._update_running(job_id, worker, "heartbeat_at = ?", (time.time(),))
+
+    def requeue(self, worker_prefix: str) -> int:
+        """Puts the running jobs of workers whose name starts with `worker_prefix` back in the queue.
+
+        Returns:
+            The number of requeued jobs.
+        """
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = NULL, worker = NULL "
+                "WHERE status = 'running' AND substr(worker, 1, ?) = ?",
+                (len(worker_prefix), worker_prefix))
+            return cursor.rowcount
+
+    def set_stage(self, job_id: str, worker: str, stage: str, artifacts: dict) -> bool:
+        return self._update_running(
+            job_id, worker, "stage = ?, artifacts = ?", (stage, json.dumps(artifacts)))
+
+    def finish(self, job_id: str, worker: str, artifacts: dict) -> bool:
+        return self._update_running(
+            job_id, worker, "status = 'done', stage = NULL, artifacts = ?, finished_at = ?",
+            (json.dumps(artifacts), time.time()))
+
+    def fail(self, job_id: str, worker: str, error: str) -> bool:
+        return self._update_running(
+            job_id, worker, "status = 'failed', error = ?, finished_at = ?",
+            (error, time.time()))
+
+    def get(self, job_id: str) -> dict:
+        """Returns the job with the given id, or None if it does not exist."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["artifacts"] = json.loads(job["artifacts"])
+        return job
+
+
+class BrainrotService:
+    """Runs queued jobs through the text, audio, subtitle and video stages with warm resources.
+
+    The Whisper model, the edge-tts voice catalogue and the HTTP session are
+    loaded once in `start` and shared by every job this process runs.
+    """
+
+    def __init__(self, queue: JobQueue, workers: dict = None):
+        self.queue = queue
+        self.workers = {**DEFAULT_WORKERS, **(workers or {})}
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.model = None
+        self.voices = None
+        self.session = None
+        self._stage_limits = {}
+        self._tasks = []
+
+    async def start(self):
+        """Loads the shared resources and starts the job workers."""
+        start = time.time()
+        print("🔥 Warming up Whisper model, voices and HTTP pool...")
+        self.model = await _run_blocking(whisper.load_model, "base")
+        self.voices = await VoicesManager.create()
+        self.session = requests.Session()
+        get_library(VIDEO_DIR).start()
+        print(f"✅ Warm-up done in {time.time() - start:.2f}s\n")
+
+        self._stage_limits = {
+            stage: asyncio.Semaphore(self.workers[stage])
+            for stage in ("text", "audio", "subtitles", "video")
+        }
+        self._tasks = [
+            asyncio.create_task(self._worker(f"{self.name}#{i}"))
+            for i in range(self.workers["jobs"])
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Jobs interrupted by the shutdown go back to the queue for another worker
+        requeued = await _run_blocking(self.queue.requeue, f"{self.name}#")
+        if requeued:
+            print(f"↩️ Requeued {requeued} interrupted job(s)")
+        if self.session is not None:
+            self.session.close()
+
+    async def _worker(self, worker_name: str):
+        backoff = POLL_INTERVAL
+        while True:
+            try:
+                job = await _run_blocking(self.queue.claim, worker_name)
+            except sqlite3.Error as e:
+                print(f"❌ {worker_name} could not claim a job: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+            backoff = POLL_INTERVAL
+
+            if job is None:
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            await self.run_job(job, worker_name)
+
+    async def _heartbeat(self, job_id: str, worker_name: str, job_task: asyncio.Task):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                held = await _run_blocking(self.queue.heartbeat, job_id, worker_name)
+            except sqlite3.Error as e:
+                print(f"❌ Could not renew the lease of job {job_id}: {e}")
+                continue
+            if not held:
+                # Another worker owns the job now; stop working on it
+                job_task.cancel()
+                return
+
+    async def run_job(self, job: dict, worker_name: str):
+        """Runs a claimed job through every stage, recording artifacts as they are produced.
+
+        The job stops early if `worker_name` loses its lease on it.
+        """
+        job_task = asyncio.create_task(self._run_stages(job, worker_name))
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"], worker_name, job_task))
+        try:
+            await job_task
+        except asyncio.CancelledError:
+            if not heartbeat.done():
+                # The worker itself is being cancelled
+                job_task.cancel()
+                raise
+            print(f"⚠️ Job {job['id']} was handed to another worker, stopping")
+        finally:
+            heartbeat.cancel()
+
+    async def _run_stages(self, job: dict, worker_name: str):
+        job_id = job["id"]
+        job_dir = os.path.join(JOBS_DIR, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        artifacts = {}
+        start = time.time()
+        print(f"🧠 Job {job_id} started")
+
+        try:
+            input_path = os.path.join(job_dir, "input.txt")
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.write(job["input_text"])
+            artifacts["input"] = input_path
+
+            await self._enter_stage(job_id, worker_name, "text", artifacts)
+            async with self._stage_limits["text"]:
+                artifacts["text"] = await _run_blocking(
+                    createText, input_path, job_dir, self.session)
+
+            await self._enter_stage(job_id, worker_name, "audio", artifacts)
+            async with self._stage_limits["audio"]:
+                audio_path = await generateAudio(job_dir, artifacts["text"], self.voices)
+            if audio_path is None:
+                raise RuntimeError("Audio generation failed")
+            artifacts["audio"] = audio_path
+
+            await self._enter_stage(job_id, worker_name, "subtitles", artifacts)
+            async with self._stage_limits["subtitles"]:
+                subtitle_path = await _run_blocking(
+                    generateSubtitlesSSA, artifacts["audio"], artifacts["text"],
+                    model=self.model, output_dir=job_dir)
+            if subtitle_path is None:
+                raise RuntimeError("Subtitle generation failed")
+            artifacts["subtitles"] = subtitle_path
+
+            await self._enter_stage(job_id, worker_name, "video", artifacts)
+            async with self._stage_limits["video"]:
+                video_paths = await _run_blocking(
+                    make_video_variants, artifacts["audio"], artifacts["subtitles"],
+                    PUBLISH_VARIANTS, file_name="brainrot.mp4", output_dir=job_dir,
+                    seed=job["seed"], work_dir=job_dir)
+            if video_paths is None:
+                raise RuntimeError("Video creation failed")
+            for name, path in video_paths.items():
+                artifacts["video" if name == "main" else f"video_{name}"] = path
+
+            if not await _run_blocking(self.queue.finish, job_id, worker_name, artifacts):
+                raise LeaseLost()
+            print(f"🎉 Job {job_id} done in {time.time() - start:.2f}s")
+        except LeaseLost:
+            print(f"⚠️ Job {job_id} was handed to another worker, stopping")
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            try:
+                await _run_blocking(self.queue.fail, job_id, worker_name, str(e))
+            except sqlite3.Error as db_error:
+                # The lease runs out and the job is retried
+                print(f"❌ Could not record the failure of job {job_id}: {db_error}")
+
+    async def _enter_stage(self, job_id: str, worker_name: str, stage: str, artifacts: dict):
+        if not await _run_blocking(self.queue.set_stage, job_id, worker_name, stage, artifacts):
+            raise LeaseLost()
+
+
+def create_app(queue: JobQueue) -> web.Application:
+    """Builds the HTTP API for submitting jobs, checking their status and downloading artifacts.
+
+    Routes:
+        POST /jobs: Queues a job. The body is either JSON `{"text": ..., "seed": ...}`, where
+            the integer seed is optional, or plain text.
+        GET /jobs/{id}: Returns the job status and its artifact names.
+        GET /jobs/{id}/artifacts/{name}: Downloads an artifact (text, audio, subtitles, video,
+            or one of the video_<variant> outputs).
+    """
+    routes = web.RouteTableDef()
+
+    @routes.post("/jobs")
+    async def submit_job(request: web.Request) -> web.Response:
+        if request.content_type == "application/json":
+            try:
+                body = await request.json()
+            except ValueError:
+                raise web.HTTPBadRequest(text="Request body is not valid JSON")
+            if not isinstance(body, dict):
+                body = {}
+            text = body.get("text", "")
+            seed = body.get("seed")
+            if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+                raise web.HTTPBadRequest(text="Job seed must be an integer")
+        else:
+            text = await request.text()
+            seed = None
+        if not isinstance(text, str) or not text.strip():
+            raise web.HTTPBadRequest(text="Job input text is empty")
+
+        job_id = await _run_blocking(queue.enqueue, text.strip(), seed)
+        return web.json_response({"id": job_id, "status": "queued"}, status=201)
+
+    @routes.get("/jobs/{job_id}")
+    async def job_status(request: web.Request) -> web.Response:
+        job = await _run_blocking(queue.get, request.match_info["job_id"])
+        if job is None:
+            raise web.HTTPNotFound(text="Job not found")
+        return web.json_response({
+            "id": job["id"],
+            "status": job["status"],
+            "stage": job["stage"],
+            "seed": job["seed"],
+            "error": job["error"],
+            "artifacts": sorted(job["artifacts"]),
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+        })
+
+    @routes.get("/jobs/{job_id}/artifacts/{name}")
+    async def job_artifact(request: web.Request) -> web.StreamResponse:
+        job = await _run_blocking(queue.get, request.match_info["job_id"])
+        if job is None:
+            raise web.HTTPNotFound(text="Job not found")
+        path = job["artifacts"].get(request.match_info["name"])
+        if path is None or not os.path.exists(path):
+            raise web.HTTPNotFound(text="Artifact not found")
+        return web.FileResponse(path)
+
+    app = web.Application()
+    app.add_routes(routes)
+    return app
+
+
+async def serve(args: argparse.Namespace):
+    queue = JobQueue(args.db)
+    service = BrainrotService(queue, {
+        "jobs": args.jobs,
+        "text": args.text_workers,
+        "audio": args.audio_workers,
+        "subtitles": args.subtitle_workers,
+        "video": args.video_workers,
+    })
+    await service.start()
+
+    runner = None
+    if not args.no_http:
+        runner = web.AppRunner(create_app(queue))
+        await runner.setup()
+        await web.TCPSite(runner, args.host, args.port).start()
+        print(f"🌐 Listening on http://{args.host}:{args.port}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        await service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the brainrot pipeline as a long-running service.")
+    parser.add_argument("--db", default=DB_PATH,
+                        help="SQLite queue file. Several services on the same machine can share it.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Start the workers and the HTTP API.")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--no-http", action="store_true",
+                              help="Only run workers against the queue.")
+    serve_parser.add_argument("--jobs", type=int, default=DEFAULT_WORKERS["jobs"])
+    serve_parser.add_argument("--text-workers", type=int, default=DEFAULT_WORKERS["text"])
+    serve_parser.add_argument("--audio-workers", type=int, default=DEFAULT_WORKERS["audio"])
+    serve_parser.add_argument("--subtitle-workers", type=int, default=DEFAULT_WORKERS["subtitles"])
+    serve_parser.add_argument("--video-workers", type=int, default=DEFAULT_WORKERS["video"])
+
+    enqueue_parser = subparsers.add_parser(
+        "enqueue", help="Queue the contents of a text file as a job.")
+    enqueue_parser.add_argument("input_file", nargs="?", default="input.txt")
+    enqueue_parser.add_argument("--seed", type=int, default=None,
+                                help="Pins the background clip of the job.")
+
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        with open(args.input_file, "r", encoding="utf-8") as f:
+            job_id = JobQueue(args.db).enqueue(f.read().strip(), args.seed)
+        print(f"✅ Queued job: {job_id}")
+    else:
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
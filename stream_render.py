@@ -0,0 +1,284 @@
+import asyncio
+import functools
+import inspect
+import math
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import edge_tts
+from edge_tts import VoicesManager
+
+from generate_audio import pick_voice
+from make_subtitles import SSA_HEADER, SUBTITLE_DIR, build_ssa_events, generateSubtitlesSSA
+from make_video import OUTPUT_PATH, TRIMMED_VIDEO_DIR, VIDEO_DIR, get_audio_duration, make_video_with_subs
+from video_library import get_library
+
+
+SEGMENT_SECONDS = 8.0  # Minimum length of an encoded segment
+OUTPUT_FPS = 30  # Segments are cut on frame boundaries at this rate so they join without drift
+ENCODE_WORKERS = 2  # Segments encoded at the same time
+WORDS_PER_SECOND = 2.0  # Slow narration pace, used to size the background range before the audio exists
+TICKS_PER_SECOND = 10_000_000  # edge-tts offsets are in 100ns units
+
+
+def _next_path(directory: str, base_name: str, ext: str) -> str:
+    """Returns the first `{base_name}{n}{ext}` path in `directory` that does not exist yet."""
+    counter = 1
+    while os.path.exists(os.path.join(directory, f"{base_name}{counter}{ext}")):
+        counter += 1
+    return os.path.join(directory, f"{base_name}{counter}{ext}")
+
+
+def _snap(seconds: float) -> float:
+    """Rounds a time to the nearest output frame."""
+    return round(seconds * OUTPUT_FPS) / OUTPUT_FPS
+
+
+def _word_boundary_options() -> dict:
+    """Asks for word timings on edge-tts versions that report sentence boundaries by default."""
+    if "boundary" in inspect.signature(edge_tts.Communicate.__init__).parameters:
+        return {"boundary": "WordBoundary"}
+    return {}
+
+
+def _write_ssa(path: str, timed_words: list):
+    with open(path, 'w', encoding='utf-8') as ssa_file:
+        ssa_file.write(SSA_HEADER)
+        ssa_file.write("\n".join(build_ssa_events(timed_words)))
+
+
+def encode_segment(background_video: str, clip_start: float, segment_start: float, segment_end: float, timed_words: list, segment_path: str, resolution: str, font_size: int) -> str:
+    """
+    Encodes one time range of the final video, with its subtitles burnt in and without audio.
+
+    Args:
+        background_video: Path to the background clip.
+        clip_start: Where the render starts in the background clip, in seconds.
+        segment_start: Start of the segment in the final video, in seconds.
+        segment_end: End of the segment in the final video, in seconds.
+        timed_words: (start, end, text) words spoken in the segment, in final video time.
+        segment_path: Path of the encoded segment.
+        resolution: The resolution of the output video (e.g., "1080x1920").
+        font_size: The font size for the subtitles.
+
+    Returns:
+        The path to the encoded segment.
+    """
+    # Subtitle times are relative to the start of the segment
+    segment_words = [
+        (max(0.0, start - segment_start), min(end, segment_end) - segment_start, text)
+        for start, end, text in timed_words
+    ]
+    subtitle_path = f"{os.path.splitext(segment_path)[0]}.ssa"
+    _write_ssa(subtitle_path, segment_words)
+
+    subtitle_path_ffmpeg = subtitle_path.replace('\\', '/')
+    width, height = map(int, resolution.split('x'))
+
+    ffmpeg_cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-ss", f"{clip_start + segment_start:.3f}",
+        "-i", background_video,
+        "-t", f"{segment_end - segment_start:.3f}",
+        "-vf", f"scale=-1:{height},crop={width}:{height},subtitles='{subtitle_path_ffmpeg}':force_style='FontSize={font_size},Alignment=10,MarginV=0'",
+        "-r", str(OUTPUT_FPS),
+        "-an",
+        "-c:v", "libx264",
+        segment_path,
+    ]
+
+    subprocess.run(ffmpeg_cmd, check=True)
+    print(f"🎬 Segment encoded: {segment_start:.2f}s - {segment_end:.2f}s")
+    return segment_path
+
+
+def join_segments(segment_paths: list, audio_path: str, background_video: str, clip_start: float, duration: float, output_path: str) -> str:
+    """
+    Joins encoded segments without re-encoding them and mixes in the narration and background audio.
+
+    Returns:
+        The path to the final video.
+    """
+    list_path = f"{os.path.splitext(segment_paths[0])[0]}_list.txt"
+    with open(list_path, 'w', encoding='utf-8') as list_file:
+        for segment_path in segment_paths:
+            segment_path_ffmpeg = os.path.abspath(
+                segment_path).replace('\\', '/').replace("'", "'\\''")
+            list_file.write(f"file '{segment_path_ffmpeg}'\n")
+
+    ffmpeg_cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-f", "concat",
+        "-safe", "0",
+        "-i", list_path,
+        "-ss", f"{clip_start:.3f}",
+        "-t", f"{duration:.3f}",
+        "-i", background_video,
+        "-i", audio_path,
+        "-filter_complex", "[1:a][2:a]amix=inputs=2:duration=first:dropout_transition=2[aout]",
+        "-map", "0:v:0",
+        "-map", "[aout]",
+        "-c:v", "copy",
+        "-c:a", "aac",
+        "-shortest",
+        output_path,
+    ]
+
+    subprocess.run(ffmpeg_cmd, check=True)
+    return output_path
+
+
+async def render_incremental(brainrot_text_path: str, output_audio_dir: str, resolution="1080x1920", font_size=24, file_name=None, output_dir: str = OUTPUT_PATH, segment_seconds: float = SEGMENT_SECONDS, seed=None, voices: VoicesManager = None) -> str:
+    """
+    Narrates the brainrot text and encodes the video while the narration is still being generated.
+
+    The word timings reported by edge-tts replace the Whisper alignment. Once the
+    narration passes the end of a segment, that segment is encoded with its
+    subtitles in the background, and the segments are joined with the finished
+    audio at the end. If edge-tts reports no word timings, or the narration does
+    not fit in the selected background range, the finished audio is rendered
+    the regular way instead.
+
+    Args:
+        brainrot_text_path: The path to the brainrot text file to narrate.
+        output_audio_dir: The directory where the audio file will be saved.
+        resolution: The desired resolution of the output video (e.g., "1080x1920").
+        font_size: The font size for the subtitles.
+        file_name: The desired name for the output video file. If None, a dynamic name is generated.
+        output_dir: The directory where the final video will be saved.
+        segment_seconds: The minimum length of each encoded segment.
+        seed: Optional seed that pins the background clip selection.
+        voices: Optional pre-loaded voice catalogue.
+
+    Returns:
+        Path to the generated final video file, or None if an error occurred.
+    """
+    os.makedirs(output_audio_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(SUBTITLE_DIR, exist_ok=True)
+
+    with open(brainrot_text_path, "r", encoding="utf-8") as file:
+        brainrot_text = file.read()
+
+    # The audio length is unknown until TTS finishes, so reserve a generous range,
+    # but never more than the longest clip can hold
+    library = get_library(VIDEO_DIR)
+    library.start()
+    reserved_duration = min(
+        len(brainrot_text.split()) / WORDS_PER_SECOND + segment_seconds,
+        library.longest_clip_duration() - 1 / OUTPUT_FPS)
+    try:
+        background_video, clip_start = library.select_clip(
+            reserved_duration, seed)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        return None
+    clip_room = library.clip_duration(background_video) - clip_start
+
+    audio_path = _next_path(output_audio_dir, "audio_", ".mp3")
+    subtitle_path = _next_path(SUBTITLE_DIR, "subtitle_", ".ssa")
+    if file_name is None:
+        final_output_path = _next_path(output_dir, "brainrot_", ".mp4")
+    else:
+        final_output_path = os.path.join(output_dir, file_name)
+    work_dir = _next_path(TRIMMED_VIDEO_DIR, "segments_", "")
+    os.makedirs(work_dir)
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=ENCODE_WORKERS)
+    segments = []
+    all_words = []
+    pending_words = []
+    segment_start = 0.0
+    overflow = False
+    used_duration = 0.0
+
+    def start_segment(segment_end: float):
+        segment_path = os.path.join(work_dir, f"segment_{len(segments)}.mp4")
+        segments.append(loop.run_in_executor(
+            executor, encode_segment, background_video, clip_start, segment_start,
+            segment_end, pending_words, segment_path, resolution, font_size))
+
+    try:
+        communicate = edge_tts.Communicate(
+            brainrot_text, await pick_voice(voices), **_word_boundary_options())
+        with open(audio_path, "wb") as audio:
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    audio.write(chunk["data"])
+                elif chunk["type"] == "WordBoundary":
+                    start = chunk["offset"] / TICKS_PER_SECOND
+                    end = start + chunk["duration"] / TICKS_PER_SECOND
+
+                    # Every word before this one is known, so the segment can be cut here
+                    if not overflow and pending_words and start >= segment_start + segment_seconds:
+                        segment_end = _snap(start)
+                        if segment_end > clip_room:
+                            # The narration outgrew the background range; stop encoding
+                            overflow = True
+                        else:
+                            start_segment(segment_end)
+                            segment_start = segment_end
+                            pending_words = []
+
+                    word = (start, end, chunk["text"])
+                    pending_words.append(word)
+                    all_words.append(word)
+        print(f"✅ Audio saved to: {audio_path}")
+
+        async def render_regular(subtitle_path: str) -> str:
+            executor.shutdown(wait=False, cancel_futures=True)
+            await asyncio.gather(*segments, return_exceptions=True)
+            return await loop.run_in_executor(
+                None, functools.partial(
+                    make_video_with_subs, audio_path, subtitle_path, resolution=resolution,
+                    font_size=font_size, file_name=os.path.basename(final_output_path),
+                    output_dir=output_dir, seed=seed))
+
+        if not all_words:
+            print("⚠️ edge-tts reported no word timings, aligning the subtitles with Whisper")
+            whisper_subtitle_path = await loop.run_in_executor(
+                None, generateSubtitlesSSA, audio_path, brainrot_text_path)
+            if whisper_subtitle_path is None:
+                return None
+            return await render_regular(whisper_subtitle_path)
+
+        duration = await loop.run_in_executor(None, get_audio_duration, audio_path)
+        video_end = math.ceil(duration * OUTPUT_FPS) / OUTPUT_FPS
+        _write_ssa(subtitle_path, all_words)
+        print(f"✅ SSA subtitle file saved to: {subtitle_path}")
+
+        if overflow or video_end > clip_room:
+            print(f"⚠️ Audio ({duration:.2f}s) is longer than the reserved background range "
+                  f"({clip_room:.2f}s), rendering it the regular way")
+            return await render_regular(subtitle_path)
+
+        start_segment(video_end)
+        segment_paths = await asyncio.gather(*segments)
+        await loop.run_in_executor(
+            None, join_segments, segment_paths, audio_path, background_video,
+            clip_start, duration, final_output_path)
+
+        used_duration = duration
+        print(f"✅ Final video created: {final_output_path}")
+        return final_output_path
+
+    except subprocess.CalledProcessError as e:
+        print(f"FFmpeg error: {e}")
+        return None
+    except Exception as e:
+        print(f"❌ An error occurred: {e}")
+        return None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        await asyncio.gather(*segments, return_exceptions=True)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        # Only keep the part of the background range that ended up in the video
+        library.release_clip(background_video, clip_start,
+                             reserved_duration, used_duration)
@@ -0,0 +1,98 @@
+import pytest
+
+import generate_text
+from generate_text import (count_tokens, createText, get_system_prompt, select_definitions,
+                           split_into_chunks)
+
+
+def test_split_into_chunks_keeps_short_text_whole():
+    assert split_into_chunks("One paragraph.\n\nAnother one.", 1000) == [
+        "One paragraph.\n\nAnother one."]
+
+
+def test_split_into_chunks_breaks_at_paragraphs_within_limit():
+    paragraphs = [" ".join(["word"] * 40) + "." for _ in range(5)]
+    text = "\n\n".join(paragraphs)
+    limit = count_tokens(paragraphs[0]) * 2 + 5
+
+    chunks = split_into_chunks(text, limit)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= limit for chunk in chunks)
+    assert "\n\n".join(chunks) == text
+
+
+def test_split_into_chunks_splits_long_paragraphs_between_sentences():
+    sentences = [f"Sentence number {i} goes here." for i in range(30)]
+    text = " ".join(sentences)
+
+    chunks = split_into_chunks(text, count_tokens(text) // 3)
+
+    assert len(chunks) > 1
+    # Sentences of one paragraph are joined back with spaces, in order
+    assert " ".join(chunks) == text
+
+
+def test_create_text_rejects_budget_without_room_for_input(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPEN_ROUTER_API", "key")
+    input_path = tmp_path / "input.txt"
+    input_path.write_text("Some input.", encoding="utf-8")
+
+    def fail_request(*args, **kwargs):
+        raise AssertionError("no request should be sent")
+
+    monkeypatch.setattr(generate_text, "_requestBrainrot", fail_request)
+    prompt_tokens = count_tokens(generate_text.SYSTEM_PROMPT)
+
+    with pytest.raises(ValueError, match="no room for input"):
+        createText(str(input_path), str(tmp_path), token_budget=prompt_tokens + 10,
+                   prompt_mode="full")
+
+
+def test_select_definitions_full_mode_uses_every_definition():
+    assert select_definitions("anything", "full") is None
+
+
+def test_select_definitions_relevant_includes_words_from_input():
+    words = select_definitions("this guy has no rizz, total NPC energy", "relevant", 1500)
+
+    assert "Rizz" in words
+    assert "NPC" in words
+    _, prompt_tokens = get_system_prompt(words)
+    _, full_tokens = get_system_prompt()
+    assert prompt_tokens < full_tokens
+
+
+def test_select_definitions_stays_within_budget():
+    tokens = generate_text._definition_tokens()
+
+    for mode in ("random", "relevant"):
+        words = select_definitions("rizz sigma skibidi", mode, 300)
+        assert sum(tokens[word] for word in words) <= 300
+
+
+def test_select_definitions_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        select_definitions("text", "everything")
+
+
+def test_create_text_uses_one_prompt_for_every_chunk(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPEN_ROUTER_API", "key")
+    paragraphs = [" ".join(["word"] * 300) + "." for _ in range(4)]
+    input_path = tmp_path / "input.txt"
+    input_path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+
+    prompts = []
+
+    def fake_request(text, api, http, system_prompt):
+        prompts.append(system_prompt)
+        return text
+
+    monkeypatch.setattr(generate_text, "_requestBrainrot", fake_request)
+    output_path = createText(str(input_path), str(tmp_path / "out"),
+                             session=object(), chunk_tokens=400, prompt_mode="random")
+
+    assert len(prompts) > 1
+    assert len(set(prompts)) == 1
+    with open(output_path, encoding="utf-8") as f:
+        assert f.read() == "\n\n".join(paragraphs)
@@ -0,0 +1,40 @@
+from make_subtitles import build_ssa_events, group_words
+
+WORDS = [
+    (0.0, 0.3, "Bro"),
+    (0.35, 0.6, "we"),
+    (0.62, 1.0, "tryna"),
+    (1.05, 1.3, "build"),
+    (1.35, 1.6, "the"),
+    (3.0, 3.5, "Eiffel"),
+]
+
+
+def test_group_words_splits_on_size_and_pauses():
+    groups = group_words(WORDS, words_per_event=4, max_gap=0.6)
+
+    assert [[w[2] for w in group] for group in groups] == [
+        ["Bro", "we", "tryna", "build"], ["the"], ["Eiffel"]]
+
+
+def test_build_ssa_events_karaoke_reveals_words_in_order():
+    events = build_ssa_events(WORDS[:4], words_per_event=4)
+
+    assert events == [
+        "Dialogue: 0,0:00:00.00,0:00:01.30,Karaoke,,0,0,0,,"
+        "{\\ko35}Bro {\\ko27}we {\\ko43}tryna {\\ko25}build"]
+
+
+def test_build_ssa_events_single_words_match_old_output():
+    events = build_ssa_events(WORDS[:2], words_per_event=1, karaoke=False)
+
+    assert events == [
+        "Dialogue: 0,0:00:00.00,0:00:00.30,Default,,0,0,0,,Bro",
+        "Dialogue: 0,0:00:00.35,0:00:00.60,Default,,0,0,0,,we",
+    ]
+
+
+def test_build_ssa_events_without_karaoke_shows_whole_phrase():
+    events = build_ssa_events(WORDS[:3], words_per_event=3, karaoke=False)
+
+    assert events == ["Dialogue: 0,0:00:00.00,0:00:01.00,Default,,0,0,0,,Bro we tryna"]
@@ -0,0 +1,75 @@
+import os
+
+import make_video
+from make_video import PUBLISH_VARIANTS, make_video_variants
+
+
+class FakeLibrary:
+    def start(self):
+        pass
+
+    def select_clip(self, duration, seed=None):
+        return "background.mp4", 12.0
+
+
+def render(tmp_path, monkeypatch, variants=PUBLISH_VARIANTS):
+    """Runs make_video_variants with FFmpeg stubbed out and returns the outputs and the render command."""
+    commands = []
+    monkeypatch.setattr(make_video.subprocess, "run",
+                        lambda cmd, check: commands.append(cmd))
+    monkeypatch.setattr(make_video, "get_library", lambda video_dir: FakeLibrary())
+    monkeypatch.setattr(make_video, "get_audio_duration", lambda path: 40.0)
+    subtitle_path = tmp_path / "subtitle.ssa"
+    subtitle_path.write_text("", encoding="utf-8")
+
+    outputs = make_video_variants(
+        "audio.mp3", str(subtitle_path), variants, file_name="brainrot.mp4",
+        output_dir=str(tmp_path / "out"), work_dir=str(tmp_path / "work"))
+    trim_cmd, render_cmd = commands
+    assert trim_cmd[trim_cmd.index("-ss") + 1] == "12.0"
+    return outputs, render_cmd
+
+
+def test_filter_graph_splits_once_per_variant(tmp_path, monkeypatch):
+    outputs, cmd = render(tmp_path, monkeypatch)
+
+    filters = cmd[cmd.index("-filter_complex") + 1]
+    video_count = len([v for v in PUBLISH_VARIANTS if v.get("kind") != "sprite"])
+    assert f"split={len(PUBLISH_VARIANTS)}" in filters
+    assert f"asplit={video_count}" in filters
+    assert filters.count("subtitles=") == 1
+    assert sorted(outputs) == sorted(v["name"] for v in PUBLISH_VARIANTS)
+
+
+def test_each_video_output_maps_its_own_streams(tmp_path, monkeypatch):
+    outputs, cmd = render(tmp_path, monkeypatch)
+
+    audio_index = 0
+    # The options of an output are everything between the previous output path and its own
+    start = cmd.index("-filter_complex") + 2
+    for i, variant in enumerate(PUBLISH_VARIANTS):
+        path = outputs[variant["name"]]
+        end = cmd.index(path)
+        options = cmd[start:end]
+        start = end + 1
+
+        assert options[:2] == ["-map", f"[v{i}]"]
+        if variant.get("kind") == "sprite":
+            assert "-c:a" not in options
+            assert options.count("-map") == 1
+            assert options[2:6] == ["-frames:v", "1", "-update", "1"]
+            assert path.endswith(".jpg")
+        else:
+            assert options[2:4] == ["-map", f"[a{audio_index}]"]
+            assert path.endswith(".mp4")
+            audio_index += 1
+
+
+def test_single_variant_keeps_the_main_name(tmp_path, monkeypatch):
+    outputs, cmd = render(
+        tmp_path, monkeypatch, [{"name": "main", "resolution": "1080x1920"}])
+
+    assert outputs == {"main": os.path.join(str(tmp_path / "out"), "brainrot.mp4")}
+    assert cmd[-1] == outputs["main"]
+    # The unseeded trim is removed once the render is done
+    assert not os.listdir(tmp_path / "work")
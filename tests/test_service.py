@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import service
+from service import BrainrotService, JobQueue, create_app
+
+
+def test_claim_returns_oldest_queued_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    first = queue.enqueue("first")
+    queue.enqueue("second")
+
+    job = queue.claim("node#0")
+
+    assert job["id"] == first
+    assert queue.get(first)["status"] == "running"
+    assert queue.get(first)["worker"] == "node#0"
+
+
+def test_claim_on_empty_queue_returns_none(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+    assert queue.claim("node#0") is None
+
+
+def test_claim_requeues_jobs_with_expired_lease(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.enqueue("text")
+    queue.claim("crashed#0")
+
+    assert queue.claim("node#0", lease_timeout=60) is None
+    time.sleep(0.05)
+    job = queue.claim("node#0", lease_timeout=0.01)
+
+    assert job["id"] == job_id
+    assert queue.get(job_id)["worker"] == "node#0"
+
+
+def test_heartbeat_keeps_the_lease(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.enqueue("text")
+    queue.claim("node#0")
+    time.sleep(0.05)
+    assert queue.heartbeat(job_id, "node#0")
+
+    assert queue.claim("other#0", lease_timeout=0.04) is None
+    assert queue.get(job_id)["worker"] == "node#0"
+
+
+def test_stale_worker_cannot_update_a_reclaimed_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.enqueue("text")
+    queue.claim("stale#0")
+    time.sleep(0.05)
+    queue.claim("node#0", lease_timeout=0.01)
+
+    assert not queue.heartbeat(job_id, "stale#0")
+    assert not queue.set_stage(job_id, "stale#0", "video", {"video": "stale.mp4"})
+    assert not queue.finish(job_id, "stale#0", {"video": "stale.mp4"})
+    assert not queue.fail(job_id, "stale#0", "boom")
+
+    job = queue.get(job_id)
+    assert job["status"] == "running"
+    assert job["worker"] == "node#0"
+    assert job["artifacts"] == {}
+    assert queue.finish(job_id, "node#0", {"video": "node.mp4"})
+    assert queue.get(job_id)["status"] == "done"
+
+
+def test_run_job_stops_when_the_lease_is_lost(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.enqueue("text")
+    job = queue.claim("stale#0")
+    queue.requeue("stale#")
+    monkeypatch.setattr(service, "HEARTBEAT_INTERVAL", 0.01)
+
+    worker = BrainrotService(queue)
+
+    async def run_forever(job, worker_name):
+        await asyncio.sleep(60)
+
+    worker._run_stages = run_forever
+    asyncio.run(asyncio.wait_for(worker.run_job(job, "stale#0"), timeout=5))
+
+    assert queue.get(job_id)["status"] == "queued"
+
+
+def test_requeue_only_touches_matching_workers(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    mine = queue.enqueue("mine")
+    theirs = queue.enqueue("theirs")
+    queue.claim("host:1#0")
+    queue.claim("host:2#0")
+
+    assert queue.requeue("host:1#") == 1
+    assert queue.get(mine)["status"] == "queued"
+    assert queue.get(theirs)["status"] == "running"
+
+
+def test_submit_job_rejects_malformed_json(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+    async def post(body):
+        async with TestClient(TestServer(create_app(queue))) as client:
+            response = await client.post(
+                "/jobs", data=body, headers={"Content-Type": "application/json"})
+            return response.status
+
+    assert asyncio.run(post("{not json")) == 400
+    assert asyncio.run(post('{"text": "hello"}')) == 201
+
+
+def test_submit_job_stores_the_seed(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+    async def post(body):
+        async with TestClient(TestServer(create_app(queue))) as client:
+            response = await client.post(
+                "/jobs", data=body, headers={"Content-Type": "application/json"})
+            return response.status, await response.json() if response.status == 201 else None
+
+    status, body = asyncio.run(post('{"text": "hello", "seed": 42}'))
+    assert status == 201
+    assert queue.get(body["id"])["seed"] == 42
+    assert asyncio.run(post('{"text": "hello", "seed": "abc"}'))[0] == 400
@@ -0,0 +1,82 @@
+import asyncio
+
+import stream_render
+
+
+class FakeCommunicate:
+    """Stand-in for edge_tts.Communicate that only reports sentence boundaries, like edge-tts 7.3 by default."""
+
+    def __init__(self, text, voice, **options):
+        self.options = options
+
+    async def stream(self):
+        yield {"type": "audio", "data": b"mp3"}
+        yield {"type": "SentenceBoundary", "offset": 0, "duration": 10_000_000, "text": "Hello there."}
+
+
+class FakeLibrary:
+    def __init__(self):
+        self.released = []
+
+    def start(self):
+        pass
+
+    def longest_clip_duration(self):
+        return 100.0
+
+    def select_clip(self, duration, seed=None):
+        return "background.mp4", 0.0
+
+    def clip_duration(self, video_path):
+        return 100.0
+
+    def release_clip(self, video_path, start, reserved, used=0.0):
+        self.released.append((start, reserved, used))
+
+
+def test_render_falls_back_to_whisper_without_word_timings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    text_path = tmp_path / "brainrot.txt"
+    text_path.write_text("Hello there.", encoding="utf-8")
+    library = FakeLibrary()
+    calls = []
+
+    async def pick_voice(voices=None):
+        return "en-US-GuyNeural"
+
+    def generate_subtitles(audio_path, text_path):
+        calls.append(("subtitles", text_path))
+        return "whisper.ssa"
+
+    def make_video(audio_path, subtitle_path, **kwargs):
+        calls.append(("video", subtitle_path))
+        return "final.mp4"
+
+    monkeypatch.setattr(stream_render.edge_tts, "Communicate", FakeCommunicate)
+    monkeypatch.setattr(stream_render, "pick_voice", pick_voice)
+    monkeypatch.setattr(stream_render, "get_library", lambda video_dir: library)
+    monkeypatch.setattr(stream_render, "generateSubtitlesSSA", generate_subtitles)
+    monkeypatch.setattr(stream_render, "make_video_with_subs", make_video)
+
+    result = asyncio.run(stream_render.render_incremental(
+        str(text_path), str(tmp_path / "audio"), output_dir=str(tmp_path / "videos")))
+
+    assert result == "final.mp4"
+    assert calls == [("subtitles", str(text_path)), ("video", "whisper.ssa")]
+    # Nothing was rendered from the reserved range, so it is given back
+    assert library.released[0][2] == 0.0
+
+
+def test_word_boundaries_are_requested_when_supported(monkeypatch):
+    class Communicate:
+        def __init__(self, text, voice, *, boundary="SentenceBoundary"):
+            pass
+
+    class OldCommunicate:
+        def __init__(self, text, voice):
+            pass
+
+    monkeypatch.setattr(stream_render.edge_tts, "Communicate", Communicate)
+    assert stream_render._word_boundary_options() == {"boundary": "WordBoundary"}
+    monkeypatch.setattr(stream_render.edge_tts, "Communicate", OldCommunicate)
+    assert stream_render._word_boundary_options() == {}
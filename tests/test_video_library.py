@@ -0,0 +1,217 @@
+import fcntl
+import os
+
+import pytest
+
+from video_library import FILL_LOCK_FILE, VideoLibrary, _unused_gaps
+
+
+class FakeChannel:
+    """Local stand-in for yt_dlp: lists a fixed channel and writes fake clips."""
+
+    def __init__(self, ids, rejected=(), size=100):
+        self.ids = list(ids)
+        self.rejected = set(rejected)
+        self.size = size
+        self.list_calls = 0
+        self.downloads = []
+
+    def list_entries(self, channel_url):
+        self.list_calls += 1
+        return [{"id": video_id, "url": f"https://example.com/{video_id}", "title": video_id}
+                for video_id in self.ids]
+
+    def download(self, video_url, output_dir):
+        video_id = video_url.rsplit("/", 1)[1]
+        self.downloads.append(video_id)
+        if video_id in self.rejected:
+            raise ValueError(f"Video title contains 'Vertical': {video_id}")
+        path = os.path.join(output_dir, f"{video_id}.mp4")
+        with open(path, "wb") as f:
+            f.write(b"\0" * self.size)
+        return path
+
+
+def make_library(tmp_path, channel, **kwargs):
+    kwargs.setdefault("trim_cache_dir", str(tmp_path / "cache"))
+    return VideoLibrary(str(tmp_path), channel_url="https://example.com/channel",
+                        list_entries=channel.list_entries, download=channel.download,
+                        probe_duration=lambda path: 100.0, **kwargs)
+
+
+def test_channel_listing_is_cached_until_ttl(tmp_path):
+    channel = FakeChannel(["a", "b"])
+    library = make_library(tmp_path, channel, listing_ttl=3600)
+
+    library.channel_entries()
+    library.channel_entries()
+    assert channel.list_calls == 1
+
+    library.listing_ttl = 0
+    library.channel_entries()
+    assert channel.list_calls == 2
+
+
+def test_fill_reaches_target_and_skips_known_ids(tmp_path):
+    channel = FakeChannel(["a", "b", "c"])
+    library = make_library(tmp_path, channel, target_size=2)
+
+    assert len(library.fill()) == 2
+    assert len(library.videos()) == 2
+
+    # Growing the target only downloads the video that is not in the library yet
+    library.target_size = 3
+    library.fill()
+    assert sorted(channel.downloads) == ["a", "b", "c"]
+    assert not os.listdir(library.incoming_dir)
+
+
+def test_fill_never_retries_rejected_ids(tmp_path):
+    channel = FakeChannel(["bad", "good"], rejected={"bad"})
+    library = make_library(tmp_path, channel, target_size=2)
+
+    library.fill()
+    library.fill()
+
+    assert channel.downloads.count("bad") == 1
+    assert [os.path.basename(p) for p in library.videos()] == ["good.mp4"]
+
+
+def test_fill_respects_explicit_target_size(tmp_path):
+    channel = FakeChannel(["a", "b", "c"])
+    library = make_library(tmp_path, channel, target_size=3)
+
+    assert len(library.fill(target_size=1)) == 1
+
+
+def test_fill_clears_partial_downloads(tmp_path):
+    channel = FakeChannel(["a"])
+    library = make_library(tmp_path, channel, target_size=1)
+    os.makedirs(library.incoming_dir)
+    with open(os.path.join(library.incoming_dir, "crashed.mp4.part"), "wb") as f:
+        f.write(b"\0" * 10)
+
+    library.fill()
+
+    assert not os.listdir(library.incoming_dir)
+
+
+def test_fill_skips_while_another_process_downloads(tmp_path):
+    channel = FakeChannel(["a"])
+    library = make_library(tmp_path, channel, target_size=1)
+
+    with open(tmp_path / FILL_LOCK_FILE, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        assert library.fill() == []
+    assert channel.downloads == []
+
+    assert len(library.fill()) == 1
+
+
+def test_libraries_sharing_a_directory_keep_each_others_updates(tmp_path):
+    channel = FakeChannel(["a"])
+    first = make_library(tmp_path, channel, target_size=1)
+    second = make_library(tmp_path, channel, target_size=1)
+    first.fill()
+
+    first.select_clip(20, seed=1)
+    second.select_clip(20, seed=2)
+
+    index = first._load_index()
+    assert sorted(index["selections"]) == ["1", "2"]
+    assert len(index["videos"]["a.mp4"]["used"]) == 2
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".tmp")]
+
+
+def test_evict_removes_least_recently_used_over_quota(tmp_path):
+    channel = FakeChannel(["a", "b", "c"], size=100)
+    library = make_library(tmp_path, channel, target_size=3, max_bytes=1000)
+    library.fill()
+    paths = {os.path.basename(p): p for p in library.videos()}
+    library.mark_used(paths["a.mp4"])
+    library.mark_used(paths["c.mp4"])
+
+    library.max_bytes = 250
+    removed = library.evict()
+
+    assert [os.path.basename(p) for p in removed] == ["b.mp4"]
+    assert sorted(os.path.basename(p) for p in library.videos()) == ["a.mp4", "c.mp4"]
+
+
+def test_evict_keeps_the_protected_clip(tmp_path):
+    channel = FakeChannel(["a", "b"], size=100)
+    library = make_library(tmp_path, channel, target_size=2, max_bytes=1000)
+    library.fill()
+    paths = sorted(library.videos())
+
+    library.max_bytes = 0
+    library.evict(keep=paths[0])
+
+    assert library.videos() == [paths[0]]
+
+
+def test_unused_gaps():
+    assert _unused_gaps([], 100) == [(0.0, 100)]
+    assert _unused_gaps([[10, 20], [50, 60]], 100) == [(0.0, 10), (20, 50), (60, 100)]
+    # Overlapping and unsorted intervals are merged; ranges touching the ends leave no gap
+    assert _unused_gaps([[40, 100], [0, 10], [5, 30]], 100) == [(30, 40)]
+
+
+def test_select_clip_prefers_unused_ranges(tmp_path):
+    channel = FakeChannel(["a"])
+    library = make_library(tmp_path, channel, target_size=1)
+    library.fill()
+
+    picks = [library.select_clip(25) for _ in range(4)]
+
+    ranges = sorted((start, start + 25) for _, start in picks)
+    for (_, end), (next_start, _) in zip(ranges, ranges[1:]):
+        assert end <= next_start
+
+
+def test_select_clip_is_pinned_by_seed(tmp_path):
+    channel = FakeChannel(["a", "b"])
+    library = make_library(tmp_path, channel, target_size=2)
+    library.fill()
+
+    first = library.select_clip(30, seed=42)
+    library.select_clip(30)
+    assert library.select_clip(30, seed=42) == first
+
+
+def test_select_clip_rejects_clips_shorter_than_duration(tmp_path):
+    channel = FakeChannel(["a"])
+    library = make_library(tmp_path, channel, target_size=1)
+    library.fill()
+
+    with pytest.raises(ValueError):
+        library.select_clip(150)
+
+
+def test_evict_prunes_cached_trims(tmp_path):
+    channel = FakeChannel(["a", "a_b"], size=100)
+    library = make_library(tmp_path, channel, target_size=2)
+    library.fill()
+    paths = {os.path.basename(p): p for p in library.videos()}
+    for path in paths.values():
+        with open(library.trim_cache_path(path, 1.0, 10.0), "wb"):
+            pass
+    library.mark_used(paths["a_b.mp4"])
+
+    library.max_bytes = 150
+    library.evict()
+
+    assert os.listdir(tmp_path / "cache") == ["a_b__1.00_10.000.mp4"]
+
+
+def test_release_clip_shrinks_the_reserved_range(tmp_path):
+    channel = FakeChannel(["a"])
+    library = make_library(tmp_path, channel, target_size=1)
+    library.fill()
+
+    video, start = library.select_clip(60)
+    library.release_clip(video, start, 60, 20)
+
+    assert library.clip_duration(video) == 100.0
+    assert library.longest_clip_duration() == 100.0
+    assert library._load_index()["videos"]["a.mp4"]["used"] == [[start, start + 20]]
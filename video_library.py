@@ -0,0 +1,518 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are kept apart
+    fcntl = None
+
+from pydub.utils import mediainfo  # type: ignore
+from generate_bg_video import CHANNEL_URL, download_full_video, get_channel_entries
+
+
+VIDEO_DIR = "output/background_videos"
+INDEX_FILE = "library.json"
+LOCK_FILE = "library.lock"  # Serialises index updates between processes
+FILL_LOCK_FILE = "fill.lock"  # Held by the one process that is downloading
+INCOMING_DIR = ".incoming"  # Downloads land here and are moved in once complete
+TRIM_CACHE_DIR = "output/trimmed_videos/cache"  # Trimmed ranges kept for seeded re-renders
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv")
+
+TARGET_SIZE = 5  # Number of background clips to keep on disk
+MAX_BYTES = 10 * 1024 * 1024 * 1024  # Disk quota for the library (10 GB)
+LISTING_TTL = 6 * 60 * 60  # Seconds before the channel listing is fetched again
+REFILL_INTERVAL = 10 * 60  # Seconds between background top-ups
+MAX_ATTEMPTS = 5  # Downloads to try per top-up before waiting for the next one
+
+
+def get_video_duration(video_path):
+    info = mediainfo(video_path)
+    return float(info['duration'])
+
+
+def _unused_gaps(used, length):
+    """Returns the (start, end) ranges of [0, length] that no used interval covers."""
+    gaps = []
+    position = 0.0
+    for start, end in sorted(used):
+        if start > position:
+            gaps.append((position, min(start, length)))
+        position = max(position, end)
+    if position < length:
+        gaps.append((position, length))
+    return [(start, end) for start, end in gaps if end > start]
+
+
+class VideoLibrary:
+    """
+    Keeps a pool of background clips on disk and tops it up in the background.
+
+    The library index (`library.json` in the video directory) records every clip
+    with its YouTube id, size, duration, the time ranges already used in renders
+    and when it was last used, along with the cached channel listing, the ids
+    that were rejected by `download_full_video` and the clip picked for each seed.
+    Clips that are placed in the directory by hand are picked up as well.
+
+    Several processes on the same machine can share a library: index updates
+    take a file lock, and only one process downloads at a time.
+
+    Args:
+        video_dir (str): The directory holding the background clips.
+        channel_url (str): The YouTube channel to download clips from.
+        target_size (int): The number of clips to keep on disk.
+        max_bytes (int): The disk quota. The least recently used clips are removed above it.
+        listing_ttl (float): Seconds the cached channel listing stays valid.
+        list_entries (callable): Lists a channel's videos, see `get_channel_entries`.
+        download (callable): Downloads a video URL into a directory, see `download_full_video`.
+        probe_duration (callable): Returns the duration of a clip in seconds.
+        trim_cache_dir (str): The directory holding cached trims of the clips. The
+            trims of a clip are removed when the clip is evicted.
+    """
+
+    def __init__(self, video_dir=VIDEO_DIR, channel_url=CHANNEL_URL, target_size=TARGET_SIZE,
+                 max_bytes=MAX_BYTES, listing_ttl=LISTING_TTL,
+                 list_entries=get_channel_entries, download=download_full_video,
+                 probe_duration=get_video_duration, trim_cache_dir=TRIM_CACHE_DIR):
+        self.video_dir = video_dir
+        self.channel_url = channel_url
+        self.target_size = target_size
+        self.max_bytes = max_bytes
+        self.listing_ttl = listing_ttl
+        self.list_entries = list_entries
+        self.download = download
+        self.probe_duration = probe_duration
+        self.index_path = os.path.join(video_dir, INDEX_FILE)
+        self.incoming_dir = os.path.join(video_dir, INCOMING_DIR)
+        self.trim_cache_dir = trim_cache_dir
+
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+        self._fill_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        os.makedirs(video_dir, exist_ok=True)
+
+    @contextmanager
+    def _lock(self):
+        """Holds the index lock of this thread and, where supported, of every other process."""
+        with self._thread_lock:
+            if self._lock_depth or fcntl is None:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with open(os.path.join(self.video_dir, LOCK_FILE), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            index = {}
+        index.setdefault("videos", {})
+        index.setdefault("rejected", [])
+        index.setdefault("channel", None)
+        index.setdefault("selections", {})
+        return index
+
+    def _save_index(self, index):
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f"{INDEX_FILE}.", suffix=".tmp", dir=self.video_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_path, self.index_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _scan(self, index):
+        """Brings the index in line with the clips that are actually on disk."""
+        on_disk = {
+            f for f in os.listdir(self.video_dir) if f.lower().endswith(VIDEO_EXTENSIONS)
+        }
+        videos = index["videos"]
+        for name in list(videos):
+            if name not in on_disk:
+                del videos[name]
+        now = time.time()
+        for name in on_disk:
+            size = os.path.getsize(os.path.join(self.video_dir, name))
+            if name not in videos:
+                videos[name] = {"id": None, "size": size,
+                                "added_at": now, "last_used": None}
+            else:
+                videos[name]["size"] = size
+            videos[name].setdefault("duration", None)
+            videos[name].setdefault("used", [])
+        return index
+
+    def videos(self):
+        """
+        Lists the clips in the library.
+
+        Returns:
+            list: The paths of every clip on disk.
+        """
+        with self._lock():
+            index = self._scan(self._load_index())
+            self._save_index(index)
+        return [os.path.join(self.video_dir, name) for name in sorted(index["videos"])]
+
+    def mark_used(self, video_path):
+        """Records that a clip was just used, so it is evicted last."""
+        name = os.path.basename(video_path)
+        with self._lock():
+            index = self._scan(self._load_index())
+            if name in index["videos"]:
+                index["videos"][name]["last_used"] = time.time()
+            self._save_index(index)
+
+    def select_clip(self, duration, seed=None):
+        """
+        Picks a background clip and a start time for a render of `duration` seconds.
+
+        Clips and time ranges that have not been used yet are preferred, and the
+        chosen range is recorded so later renders avoid it. When a `seed` is given
+        the first pick is remembered, and every later call with the same seed
+        returns the same clip and start, so a re-render can reuse its trimmed clip.
+
+        Args:
+            duration (float): The length of the range to select, in seconds.
+            seed (int | str): Optional seed that pins the selection.
+
+        Returns:
+            tuple: The path to the clip and the start time in seconds.
+
+        Raises:
+            FileNotFoundError: If there are no videos in the library yet.
+            ValueError: If every clip is shorter than `duration`.
+        """
+        self._probe_durations()
+        with self._lock():
+            index = self._scan(self._load_index())
+            videos = index["videos"]
+            if not videos:
+                raise FileNotFoundError("No video files found in directory.")
+
+            key = str(seed) if seed is not None else None
+            pinned = index["selections"].get(key) if key is not None else None
+            if pinned and pinned["video"] in videos:
+                clip_duration = videos[pinned["video"]]["duration"]
+                if clip_duration and pinned["start"] + duration <= clip_duration:
+                    name, start = pinned["video"], pinned["start"]
+                    videos[name]["last_used"] = time.time()
+                    self._save_index(index)
+                    return os.path.join(self.video_dir, name), start
+
+            rng = random.Random(seed) if seed is not None else random.Random()
+            eligible = [name for name in sorted(videos)
+                        if videos[name]["duration"] and videos[name]["duration"] > duration]
+            if not eligible:
+                raise ValueError("Audio is longer than every background video.")
+
+            # Ranges long enough to hold the render, weighted by how much room they leave
+            candidates = []
+            for name in eligible:
+                for gap_start, gap_end in _unused_gaps(videos[name]["used"], videos[name]["duration"]):
+                    if gap_end - gap_start >= duration:
+                        candidates.append((name, gap_start, gap_end))
+
+            if candidates:
+                weights = [gap_end - gap_start for _, gap_start, gap_end in candidates]
+                name, gap_start, gap_end = rng.choices(candidates, weights=weights)[0]
+                # Snap to an edge of the gap so the remaining free time stays in one piece
+                start = rng.choice([gap_start, gap_end - duration])
+            else:
+                # Everything has been used; fall back to the least recently used clip
+                name = min(eligible, key=lambda n: (
+                    videos[n]["last_used"] or 0, rng.random()))
+                start = rng.uniform(0, videos[name]["duration"] - duration)
+            start = round(start, 2)
+
+            videos[name]["used"].append([start, start + duration])
+            videos[name]["last_used"] = time.time()
+            if key is not None:
+                index["selections"][key] = {"video": name, "start": start}
+            self._save_index(index)
+        return os.path.join(self.video_dir, name), start
+
+    def clip_duration(self, video_path):
+        """
+        Returns the duration of a clip in the library, or None if it is unknown.
+        """
+        self._probe_durations()
+        with self._lock():
+            video = self._load_index()["videos"].get(os.path.basename(video_path))
+        return video["duration"] if video else None
+
+    def longest_clip_duration(self):
+        """
+        Returns the duration of the longest clip in the library, or 0 if there are none.
+        """
+        self._probe_durations()
+        with self._lock():
+            videos = self._scan(self._load_index())["videos"]
+        return max((v["duration"] or 0 for v in videos.values()), default=0)
+
+    def release_clip(self, video_path, start, reserved, used=0.0):
+        """
+        Shrinks a range recorded by `select_clip` to the part that was actually rendered.
+
+        Args:
+            video_path (str): The clip returned by `select_clip`.
+            start (float): The start returned by `select_clip`.
+            reserved (float): The duration that was passed to `select_clip`.
+            used (float): The duration that was rendered. 0 removes the range.
+        """
+        name = os.path.basename(video_path)
+        with self._lock():
+            index = self._scan(self._load_index())
+            video = index["videos"].get(name)
+            if video is None:
+                return
+            reserved_range = [start, start + reserved]
+            if reserved_range in video["used"]:
+                video["used"].remove(reserved_range)
+                if used > 0:
+                    video["used"].append([start, start + used])
+            self._save_index(index)
+
+    def _probe_durations(self):
+        """Fills in the duration of clips that have not been measured yet."""
+        with self._lock():
+            index = self._scan(self._load_index())
+            unknown = [name for name, video in index["videos"].items()
+                       if video["duration"] is None]
+        if not unknown:
+            return
+
+        durations = {}
+        for name in unknown:
+            try:
+                durations[name] = self.probe_duration(
+                    os.path.join(self.video_dir, name))
+            except Exception as e:
+                print(f"Could not read duration of {name}: {e}")
+        with self._lock():
+            index = self._scan(self._load_index())
+            for name, clip_duration in durations.items():
+                if name in index["videos"]:
+                    index["videos"][name]["duration"] = clip_duration
+            self._save_index(index)
+
+    def trim_cache_path(self, video_path, start, duration):
+        """
+        Returns where the trim of a clip range is cached, creating the cache directory if needed.
+
+        The clip name and the range are separated by a double underscore so the
+        trims of a clip can be found again when it is evicted.
+        """
+        os.makedirs(self.trim_cache_dir, exist_ok=True)
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        return os.path.join(self.trim_cache_dir, f"{name}__{start:.2f}_{duration:.3f}.mp4")
+
+    def _prune_trim_cache(self, video_name):
+        """Removes the cached trims of a clip."""
+        if not os.path.isdir(self.trim_cache_dir):
+            return
+        name = os.path.splitext(video_name)[0]
+        for cached in os.listdir(self.trim_cache_dir):
+            if cached.rsplit("__", 1)[0] == name:
+                os.remove(os.path.join(self.trim_cache_dir, cached))
+
+    def channel_entries(self):
+        """
+        Returns the channel listing, fetching it again only when the cached copy has expired.
+
+        Returns:
+            list: A dict with the 'id', 'url' and 'title' of each video.
+        """
+        with self._lock():
+            channel = self._load_index()["channel"]
+        if (channel and channel["url"] == self.channel_url
+                and time.time() - channel["fetched_at"] < self.listing_ttl):
+            return channel["entries"]
+
+        entries = self.list_entries(self.channel_url)
+        with self._lock():
+            index = self._load_index()
+            index["channel"] = {"url": self.channel_url,
+                                "fetched_at": time.time(), "entries": entries}
+            self._save_index(index)
+        return entries
+
+    def fill(self, max_attempts=MAX_ATTEMPTS, target_size=None):
+        """
+        Downloads clips until the library reaches its target size.
+
+        Videos that are already in the library or were rejected before are skipped.
+
+        Args:
+            max_attempts (int): The number of downloads to try before giving up.
+            target_size (int): The number of clips to reach this time. Defaults to
+                the library's target size.
+
+        Returns:
+            list: The paths of the newly downloaded clips.
+        """
+        downloaded = []
+        # Only one fill runs at a time; a concurrent request simply returns
+        if not self._fill_lock.acquire(blocking=False):
+            return downloaded
+        fill_lock_file = open(os.path.join(self.video_dir, FILL_LOCK_FILE), "a")
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fill_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Another process is downloading
+                    return downloaded
+
+            # Nobody else is downloading, so anything left here is a crashed partial download
+            shutil.rmtree(self.incoming_dir, ignore_errors=True)
+
+            with self._lock():
+                index = self._scan(self._load_index())
+                self._save_index(index)
+            if target_size is None:
+                target_size = self.target_size
+            missing = target_size - len(index["videos"])
+            if missing <= 0:
+                return downloaded
+
+            known_ids = {v["id"] for v in index["videos"].values() if v["id"]}
+            known_ids.update(index["rejected"])
+            candidates = [e for e in self.channel_entries()
+                          if e.get("id") not in known_ids]
+            random.shuffle(candidates)
+
+            for entry in candidates[:max_attempts]:
+                if len(downloaded) >= missing or self._stop.is_set():
+                    break
+                try:
+                    os.makedirs(self.incoming_dir, exist_ok=True)
+                    incoming_path = self.download(entry["url"], self.incoming_dir)
+                    path = os.path.join(
+                        self.video_dir, os.path.basename(incoming_path))
+                    os.replace(incoming_path, path)
+                except ValueError as e:
+                    # Too large or vertical; never worth trying again
+                    print(f"Failed with video: {e}")
+                    with self._lock():
+                        index = self._load_index()
+                        index["rejected"].append(entry.get("id"))
+                        self._save_index(index)
+                    continue
+                except Exception as e:
+                    print(f"Failed with video: {e}")
+                    continue
+
+                with self._lock():
+                    index = self._scan(self._load_index())
+                    name = os.path.basename(path)
+                    if name in index["videos"]:
+                        index["videos"][name]["id"] = entry.get("id")
+                    self._save_index(index)
+                downloaded.append(path)
+                self.evict(keep=path)
+        finally:
+            fill_lock_file.close()
+            self._fill_lock.release()
+        return downloaded
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used clips while the library is over its disk quota.
+
+        Args:
+            keep (str): A clip path that must not be removed, e.g. one that was just downloaded.
+
+        Returns:
+            list: The paths of the removed clips.
+        """
+        removed = []
+        keep_name = os.path.basename(keep) if keep else None
+        with self._lock():
+            index = self._scan(self._load_index())
+            videos = index["videos"]
+            total = sum(v["size"] for v in videos.values())
+            by_age = sorted(
+                (name for name in videos if name != keep_name),
+                key=lambda name: videos[name]["last_used"] or videos[name]["added_at"])
+
+            for name in by_age:
+                if total <= self.max_bytes or len(videos) <= 1:
+                    break
+                path = os.path.join(self.video_dir, name)
+                os.remove(path)
+                total -= videos[name]["size"]
+                del videos[name]
+                index["selections"] = {
+                    key: selection for key, selection in index["selections"].items()
+                    if selection["video"] != name}
+                self._prune_trim_cache(name)
+                removed.append(path)
+                print(f"🗑️ Evicted background video: {path}")
+            self._save_index(index)
+        return removed
+
+    def start(self, interval=REFILL_INTERVAL):
+        """
+        Starts a background thread that keeps the library topped up.
+
+        Calling it again while the thread is running does nothing.
+
+        Args:
+            interval (float): Seconds to wait between top-ups.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name="video-library", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread after its current download."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            try:
+                self.fill()
+            except Exception as e:
+                print(f"❌ Background video prefetch failed: {e}")
+            self._stop.wait(interval)
+
+
+_libraries = {}
+_libraries_lock = threading.Lock()
+
+
+def get_library(video_dir=VIDEO_DIR):
+    """Returns the shared `VideoLibrary` for a directory, creating it on first use."""
+    key = os.path.abspath(video_dir)
+    with _libraries_lock:
+        if key not in _libraries:
+            _libraries[key] = VideoLibrary(video_dir)
+        return _libraries[key]